@@ -0,0 +1,37 @@
+"""add_engagement_counters_to_posts
+
+Revision ID: 3b9d2e7f1a64
+Revises: 4f0008f09a74
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2e7f1a64'
+down_revision: Union[str, None] = '4f0008f09a74'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('upvote_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the existing upvotes and comments
+    op.execute("""
+        UPDATE posts p
+        SET upvote_count = (SELECT COUNT(*) FROM upvotes u WHERE u.post_id = p.id),
+            comment_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'comment_count')
+    op.drop_column('posts', 'upvote_count')
@@ -0,0 +1,78 @@
+"""add_conversations_summary
+
+Revision ID: 5e8a1c4f9b27
+Revises: 7d41c0a95e28
+Create Date: 2026-10-17 11:42:05.318904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a1c4f9b27'
+down_revision: Union[str, None] = '7d41c0a95e28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('conversations',
+    sa.Column('user_low_id', sa.Integer(), nullable=False),
+    sa.Column('user_high_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=False),
+    sa.Column('last_sender_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_preview', sa.String(length=200), nullable=False),
+    sa.Column('last_message_at', sa.DateTime(), nullable=False),
+    sa.Column('user_low_unread', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('user_high_unread', sa.Integer(), server_default='0', nullable=False),
+    sa.CheckConstraint('user_low_id < user_high_id', name='check_conversation_user_order'),
+    sa.ForeignKeyConstraint(['last_message_id'], ['messages.id'], ),
+    sa.ForeignKeyConstraint(['last_sender_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_high_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_low_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_low_id', 'user_high_id')
+    )
+    op.create_index('ix_conversations_low_last_message', 'conversations', ['user_low_id', 'last_message_at'], unique=False)
+    op.create_index('ix_conversations_high_last_message', 'conversations', ['user_high_id', 'last_message_at'], unique=False)
+
+    # Backfill one summary row per pair from existing messages
+    op.execute("""
+        WITH pairs AS (
+            SELECT id, sender_id, receiver_id, content, created_at, is_read,
+                   LEAST(sender_id, receiver_id) AS lo,
+                   GREATEST(sender_id, receiver_id) AS hi
+            FROM messages
+            WHERE sender_id <> receiver_id
+        ),
+        latest AS (
+            SELECT DISTINCT ON (lo, hi) lo, hi, id, sender_id, content, created_at
+            FROM pairs
+            ORDER BY lo, hi, id DESC
+        ),
+        unread AS (
+            SELECT lo, hi,
+                   COUNT(*) FILTER (WHERE is_read IS NOT TRUE AND receiver_id = lo) AS lo_unread,
+                   COUNT(*) FILTER (WHERE is_read IS NOT TRUE AND receiver_id = hi) AS hi_unread
+            FROM pairs
+            GROUP BY lo, hi
+        )
+        INSERT INTO conversations (
+            user_low_id, user_high_id, last_message_id, last_sender_id,
+            last_message_preview, last_message_at, user_low_unread, user_high_unread
+        )
+        SELECT l.lo, l.hi, l.id, l.sender_id, LEFT(l.content, 200),
+               COALESCE(l.created_at, now()), u.lo_unread, u.hi_unread
+        FROM latest l
+        JOIN unread u ON u.lo = l.lo AND u.hi = l.hi
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_conversations_high_last_message', table_name='conversations')
+    op.drop_index('ix_conversations_low_last_message', table_name='conversations')
+    op.drop_table('conversations')
@@ -0,0 +1,49 @@
+"""add_timeline_entries
+
+Revision ID: 7d41c0a95e28
+Revises: 3b9d2e7f1a64
+Create Date: 2026-10-17 10:03:18.442761
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d41c0a95e28'
+down_revision: Union[str, None] = '3b9d2e7f1a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('fanout_on_read', sa.Boolean(), server_default='false', nullable=False))
+    op.create_table('timeline_entries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    op.create_index('ix_timeline_entries_user_created', 'timeline_entries', ['user_id', 'created_at', 'post_id'], unique=False)
+
+    # Backfill timelines from existing follows
+    op.execute("""
+        INSERT INTO timeline_entries (user_id, post_id, author_id, created_at)
+        SELECT f.follower_id, p.id, p.author_id, p.created_at
+        FROM follows f
+        JOIN posts p ON p.author_id = f.following_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_timeline_entries_user_created', table_name='timeline_entries')
+    op.drop_table('timeline_entries')
+    op.drop_column('users', 'fanout_on_read')
@@ -0,0 +1,38 @@
+"""add_notification_coalescing
+
+Revision ID: a93f6d2b8c15
+Revises: 5e8a1c4f9b27
+Create Date: 2026-10-17 12:20:41.907263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93f6d2b8c15'
+down_revision: Union[str, None] = '5e8a1c4f9b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('target_id', sa.Integer(), nullable=True))
+    op.add_column('notifications', sa.Column('actor_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('notifications', sa.Column('sample_actor_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False))
+    op.create_index('ix_notifications_coalesce', 'notifications', ['user_id', 'type', 'target_id'], unique=False)
+
+    # Existing rows each have a single actor
+    op.execute("UPDATE notifications SET sample_actor_ids = ARRAY[actor_id]")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_coalesce', table_name='notifications')
+    op.drop_column('notifications', 'sample_actor_ids')
+    op.drop_column('notifications', 'actor_count')
+    op.drop_column('notifications', 'target_id')
@@ -0,0 +1,43 @@
+"""add_user_counters
+
+Revision ID: c4e7b91d2a08
+Revises: a93f6d2b8c15
+Create Date: 2026-10-17 13:05:12.664190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7b91d2a08'
+down_revision: Union[str, None] = 'a93f6d2b8c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('unread_messages', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill counters from existing unread rows
+    op.execute("""
+        INSERT INTO user_counters (user_id, unread_notifications, unread_messages)
+        SELECT u.id,
+               (SELECT COUNT(*) FROM notifications n WHERE n.user_id = u.id AND n.is_read IS NOT TRUE),
+               (SELECT COUNT(*) FROM messages m WHERE m.receiver_id = u.id AND m.is_read IS NOT TRUE)
+        FROM users u
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_counters')
@@ -0,0 +1,61 @@
+"""add_hot_query_indexes
+
+Revision ID: e2b7c5a91f3d
+Revises: c4e7b91d2a08
+Create Date: 2026-10-17 15:42:08.318542
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c5a91f3d'
+down_revision: Union[str, None] = 'c4e7b91d2a08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_posts_created_id', 'posts', ['created_at', 'id'], None),
+    ('ix_posts_author_created', 'posts', ['author_id', 'created_at'], None),
+    ('ix_post_tags_tag_post', 'post_tags', ['tag', 'post_id'], None),
+    ('ix_upvotes_post', 'upvotes', ['post_id'], None),
+    ('ix_comments_post_created', 'comments', ['post_id', 'created_at'], None),
+    ('ix_messages_pair_created_id', 'messages', ['sender_id', 'receiver_id', 'created_at', 'id'], None),
+    ('ix_messages_unread', 'messages', ['receiver_id', 'sender_id'], 'is_read = false'),
+    ('ix_notifications_user_created_id', 'notifications', ['user_id', 'created_at', 'id'], None),
+    ('ix_notifications_unread', 'notifications', ['user_id'], 'is_read = false'),
+    ('ix_follows_following_follower', 'follows', ['following_id', 'follower_id'], None),
+    ('ix_reviews_artist_created', 'reviews', ['artist_id', 'created_at'], None),
+    ('ix_portfolio_items_artist_created', 'portfolio_items', ['artist_id', 'created_at'], None),
+    ('ix_art_requests_created_id', 'art_requests', ['created_at', 'id'], None),
+    ('ix_art_requests_status_created_id', 'art_requests', ['status', 'created_at', 'id'], None),
+    ('ix_art_requests_requester_created_id', 'art_requests', ['requester_id', 'created_at', 'id'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY does not block writes but cannot run inside
+    # a transaction. if_not_exists lets a rerun pick up after an interrupted
+    # build; an interrupted build leaves an INVALID index that must be
+    # dropped first.
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
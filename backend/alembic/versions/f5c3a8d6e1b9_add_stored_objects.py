@@ -0,0 +1,35 @@
+"""add_stored_objects
+
+Revision ID: f5c3a8d6e1b9
+Revises: e2b7c5a91f3d
+Create Date: 2026-10-17 17:20:41.902715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c3a8d6e1b9'
+down_revision: Union[str, None] = 'e2b7c5a91f3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stored_objects',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stored_objects')
@@ -0,0 +1,147 @@
+"""
+Async versions of the hot endpoints
+
+Enabled with DB_ASYNC=true. main.py includes this router before it
+declares its own routes, so these handlers take precedence over the
+sync ones for the same paths. They run on the event loop with an
+asyncpg-backed AsyncSession instead of occupying a threadpool worker
+for the whole request, so one worker can keep many more queries in
+flight.
+
+The query logic is shared with the sync handlers: each endpoint hands
+the same helper function to AsyncSession.run_sync, which executes it
+against the async connection without blocking the loop.
+"""
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import CurrentUser, get_current_user_async, get_optional_current_user_async
+from database import get_async_db
+from feed_hydration import load_feed_page
+from message_helpers import create_message, get_conversation_list, get_message_page
+from pagination import MAX_PAGE_SIZE
+from notification_service import NotificationService
+from schemas import MessageCreate, Notification as NotificationSchema
+from user_counters import get_unread_messages, get_unread_notifications
+
+router = APIRouter()
+
+@router.get("/feed")
+async def get_feed(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    tags: str = None,
+    cursor: str = None,
+    current_user: CurrentUser = Depends(get_optional_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the global feed of posts with optional tag filtering"""
+    try:
+        return await db.run_sync(
+            load_feed_page, limit=limit, tags=tags, cursor=cursor, skip=skip, current_user=current_user
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/notifications", response_model=List[NotificationSchema])
+async def get_notifications(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = None,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get notifications for the current user; next cursor in X-Next-Cursor"""
+    try:
+        notifications, next_cursor = await db.run_sync(
+            lambda session: NotificationService(session).get_user_notifications(
+                current_user.id, limit=limit, offset=offset, cursor=cursor
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return notifications
+
+@router.get("/notifications/with-details")
+async def get_notifications_with_details(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = None,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get notifications with user details for the current user"""
+    try:
+        notifications, next_cursor = await db.run_sync(
+            lambda session: NotificationService(session).get_user_notifications_with_details(
+                current_user.id, limit=limit, offset=offset, cursor=cursor
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"notifications": notifications, "next_cursor": next_cursor}
+
+@router.get("/notifications/unread-count")
+async def get_unread_notifications_count(
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get count of unread notifications for the current user"""
+    return {"unread_count": await db.run_sync(get_unread_notifications, current_user.id)}
+
+@router.post("/send-message")
+async def send_message(
+    message_data: MessageCreate,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Send a message to another user"""
+    try:
+        return await db.run_sync(
+            create_message, current_user.id, message_data.receiver_id, message_data.content
+        )
+    except ValueError as e:
+        status_code = 404 if str(e) == "Receiver not found" else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+
+@router.get("/conversations")
+async def get_conversations(
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get list of users the current user has conversations with"""
+    return await db.run_sync(get_conversation_list, current_user.id)
+
+@router.get("/messages/{user_id}")
+async def get_messages_with_user(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = None,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get messages between current user and specified user"""
+    try:
+        return await db.run_sync(
+            get_message_page, current_user.id, user_id, limit=limit, offset=offset, cursor=cursor
+        )
+    except ValueError as e:
+        status_code = 404 if str(e) == "User not found" else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+
+@router.get("/unread-messages-count")
+async def get_unread_messages_count(
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get total count of unread messages for current user"""
+    return {"unread_count": await db.run_sync(get_unread_messages, current_user.id)}
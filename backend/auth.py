@@ -1,11 +1,35 @@
 # backend/auth.py
+import hmac
+import ipaddress
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Query, Request
+from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, get_db, get_async_db
+from models import User
 
 SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# How long a username -> identity lookup is reused before hitting the database
+IDENTITY_CACHE_TTL_SECONDS = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "30"))
+
+# Bearer token for the operational endpoints (/metrics, /cache/stats,
+# /db/...). Without one they only answer direct requests from this host.
+OPS_TOKEN = os.getenv("OPS_TOKEN")
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
@@ -18,3 +42,127 @@ def verify_token(token: str):
         return payload.get("sub")
     except JWTError:
         return None
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Identity of the authenticated user, safe to share between requests"""
+    id: int
+    username: str
+    avatar_url: str | None
+
+_identity_cache = {}  # username -> (expires_at, CurrentUser)
+_identity_lock = threading.Lock()
+
+def load_identity(db: Session, username: str):
+    """Return the CurrentUser for username, or None if no such user exists"""
+    now = time.monotonic()
+    with _identity_lock:
+        entry = _identity_cache.get(username)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    row = db.execute(
+        select(User.id, User.username, User.avatar_url).where(User.username == username)
+    ).one_or_none()
+    if row is None:
+        return None
+
+    identity = CurrentUser(id=row.id, username=row.username, avatar_url=row.avatar_url)
+    with _identity_lock:
+        _identity_cache[username] = (now + IDENTITY_CACHE_TTL_SECONDS, identity)
+    return identity
+
+def invalidate_identity(*usernames: str):
+    """Forget cached identities, e.g. after a profile update"""
+    with _identity_lock:
+        for username in usernames:
+            _identity_cache.pop(username, None)
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Dependency resolving the bearer token to a CurrentUser or raising 401"""
+    username = verify_token(token)
+    if not username:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    current_user = load_identity(db, username)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="User not found")
+    # Lets the session keep this user's reads on the primary after they write
+    db.info["user_id"] = current_user.id
+    return current_user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db=Depends(get_async_db)):
+    """get_current_user for async endpoints; cache misses run on the async session"""
+    username = verify_token(token)
+    if not username:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    current_user = await db.run_sync(load_identity, username)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return current_user
+
+async def get_optional_current_user_async(token: str = Depends(oauth2_scheme_optional), db=Depends(get_async_db)):
+    """get_optional_current_user for async endpoints"""
+    if not token:
+        return None
+    username = verify_token(token)
+    if not username:
+        return None
+    return await db.run_sync(load_identity, username)
+
+def get_optional_current_user(token: str = Depends(oauth2_scheme_optional), db: Session = Depends(get_db)):
+    """Like get_current_user, but returns None for anonymous or invalid tokens"""
+    if not token:
+        return None
+    username = verify_token(token)
+    if not username:
+        return None
+    current_user = load_identity(db, username)
+    if current_user:
+        db.info["user_id"] = current_user.id
+    return current_user
+
+def identity_from_token(token: str):
+    """
+    Resolve a raw token to a CurrentUser, or None if it is invalid
+
+    Uses its own short-lived session so long-running streams and sockets
+    do not hold a database connection.
+    """
+    username = verify_token(token)
+    if not username:
+        return None
+    with SessionLocal() as db:
+        return load_identity(db, username)
+
+def get_current_user_from_query(token: str = Query(...)):
+    """
+    Resolve a ?token= query parameter for EventSource clients, which
+    cannot send an Authorization header.
+    """
+    current_user = identity_from_token(token)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return current_user
+
+def _is_local_request(request: Request):
+    # A local reverse proxy connects from loopback on behalf of remote clients
+    if "x-forwarded-for" in request.headers or "x-real-ip" in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.client.host).is_loopback
+    except (AttributeError, ValueError):
+        return False
+
+def require_ops_access(request: Request):
+    """
+    Guard for operational endpoints that expose routes, SQL and traffic
+
+    Requires "Authorization: Bearer <OPS_TOKEN>" when OPS_TOKEN is set,
+    otherwise only allows unproxied requests from a loopback address.
+    """
+    if OPS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {OPS_TOKEN}".encode()):
+            raise HTTPException(status_code=401, detail="Invalid operations token", headers={"WWW-Authenticate": "Bearer"})
+    elif not _is_local_request(request):
+        raise HTTPException(status_code=403, detail="Operations endpoints are only available locally")
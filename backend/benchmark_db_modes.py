@@ -0,0 +1,119 @@
+"""
+Benchmark the sync and async database modes under concurrency
+
+Starts the API once with DB_ASYNC=false and once with DB_ASYNC=true,
+then fires concurrent requests at the hot endpoints (/feed,
+/notifications/with-details, /conversations, /unread-messages-count)
+and reports throughput and latency percentiles for each mode.
+
+Uses the database configured in .env / DATABASE_URL and creates a
+benchmark user if it does not exist. Requires httpx and, for the async
+mode, asyncpg.
+
+    python benchmark_db_modes.py --requests 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BENCH_USERNAME = "bench_user"
+BENCH_PASSWORD = "bench_password"
+ENDPOINTS = ["/feed", "/notifications/with-details", "/conversations", "/unread-messages-count"]
+
+def start_server(port: int, async_mode: bool):
+    env = dict(os.environ, DB_ASYNC="true" if async_mode else "false")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL
+    )
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get("/feed?limit=1")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+async def login(client: httpx.AsyncClient):
+    await client.post("/register", data={
+        "username": BENCH_USERNAME,
+        "email": f"{BENCH_USERNAME}@example.com",
+        "password": BENCH_PASSWORD
+    })
+    response = await client.post("/login", data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_load(client: httpx.AsyncClient, token: str, total: int, concurrency: int):
+    """Send total requests round-robin over ENDPOINTS with at most concurrency in flight"""
+    headers = {"Authorization": f"Bearer {token}"}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.get(ENDPOINTS[i % len(ENDPOINTS)], headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "req_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1)
+    }
+
+async def bench_mode(async_mode: bool, port: int, total: int, concurrency: int):
+    server = start_server(port, async_mode)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_until_ready(client)
+            token = await login(client)
+            # Warm up connection pools and caches
+            await run_load(client, token, min(total, 200), concurrency)
+            return await run_load(client, token, total, concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for async_mode in (False, True):
+        result = asyncio.run(bench_mode(async_mode, args.port, args.requests, args.concurrency))
+        print(f"[BENCH] {'async' if async_mode else 'sync '} {result}")
+
+if __name__ == "__main__":
+    main()
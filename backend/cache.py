@@ -0,0 +1,235 @@
+"""
+Response cache for public read endpoints
+
+Endpoints decorated with @cached store their JSON-ready response under
+a key built from the route and its parameters. Every entry is labelled
+with tags such as "user:42"; mutating endpoints call invalidate() with
+the tags they affect, which drops every entry carrying them.
+
+Right after an invalidation, a read replica may still return the old
+data, and caching that would undo the invalidation for a whole TTL. For
+READ_YOUR_WRITES_SECONDS after a tag is invalidated, @cached therefore
+computes responses carrying it on the primary database.
+
+Backends:
+    memory  In-process LRU with per-entry TTL (default)
+    redis   Shared Redis server, selected with CACHE_BACKEND=redis.
+            Requires the optional `redis` package.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+
+from database import READ_YOUR_WRITES_SECONDS, read_from_primary
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+class MemoryCacheBackend:
+    """Thread-safe LRU cache with per-entry expiry and a tag index"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._invalidated = {}  # tag -> monotonic time of its last invalidation, oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags, ttl):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        now = time.monotonic()
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                self._invalidated.pop(tag, None)
+                self._invalidated[tag] = now
+            while self._invalidated and next(iter(self._invalidated.values())) + READ_YOUR_WRITES_SECONDS < now:
+                del self._invalidated[next(iter(self._invalidated))]
+
+    def recently_invalidated(self, tags):
+        cutoff = time.monotonic() - READ_YOUR_WRITES_SECONDS
+        with self._lock:
+            return any(self._invalidated.get(tag, cutoff) > cutoff for tag in tags)
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class RedisCacheBackend:
+    """Cache stored in Redis; each tag is a Redis set of keys"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, tags, ttl):
+        pipe = self.client.pipeline()
+        pipe.setex(key, ttl, json.dumps(value))
+        for tag in tags:
+            pipe.sadd(f"tag:{tag}", key)
+            pipe.expire(f"tag:{tag}", ttl)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            keys = self.client.smembers(f"tag:{tag}")
+            if keys:
+                self.client.delete(*keys)
+            self.client.delete(f"tag:{tag}")
+            self.client.psetex(f"invalidated:{tag}", int(READ_YOUR_WRITES_SECONDS * 1000), 1)
+
+    def recently_invalidated(self, tags):
+        return bool(tags) and self.client.exists(*(f"invalidated:{tag}" for tag in tags)) > 0
+
+    def size(self):
+        return self.client.dbsize()
+
+class ResponseCache:
+    def __init__(self, backend, default_ttl: int):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, tags, ttl=None):
+        self.backend.set(key, value, list(tags), ttl or self.default_ttl)
+
+    def invalidate(self, *tags):
+        """Drop every cached response labelled with any of the given tags"""
+        self.invalidations += 1
+        try:
+            self.backend.invalidate(tags)
+        except Exception as e:
+            print(f"[CACHE] Failed to invalidate {tags}: {e}")
+
+    def recently_invalidated(self, tags):
+        """Whether any of tags was invalidated within READ_YOUR_WRITES_SECONDS"""
+        if READ_YOUR_WRITES_SECONDS <= 0:
+            return False
+        try:
+            return self.backend.recently_invalidated(list(tags))
+        except Exception as e:
+            print(f"[CACHE] Invalidation lookup failed for {tags}: {e}")
+            return True
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+def _make_backend():
+    if CACHE_BACKEND == "redis":
+        try:
+            return RedisCacheBackend(REDIS_URL)
+        except ImportError:
+            print("[CACHE] redis package not installed, falling back to memory backend")
+    return MemoryCacheBackend(CACHE_MAX_ENTRIES)
+
+response_cache = ResponseCache(_make_backend(), CACHE_TTL_SECONDS)
+
+def _cache_key(namespace: str, params: dict):
+    # Only plain parameters identify a response; sessions and the like do not
+    identity = {
+        name: value for name, value in params.items()
+        if value is None or isinstance(value, (str, int, float, bool))
+    }
+    digest = hashlib.sha1(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+    return f"{namespace}:{digest}"
+
+def cached(namespace: str, tags, ttl: int = None):
+    """
+    Cache a sync endpoint's response
+
+    Args:
+        namespace: Prefix for cache keys, usually the route name
+        tags: Callable receiving the endpoint's keyword arguments and
+            returning the tags for the cached response
+        ttl: Seconds to keep the response, defaults to CACHE_TTL_SECONDS
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(**kwargs):
+            key = _cache_key(namespace, kwargs)
+            try:
+                value = response_cache.get(key)
+            except Exception as e:
+                print(f"[CACHE] Lookup failed for {key}: {e}")
+                value = None
+            if value is not None:
+                return value
+
+            entry_tags = tags(**kwargs)
+            if response_cache.recently_invalidated(entry_tags):
+                # A replica may not have the write behind the invalidation yet
+                if kwargs.get("db") is None:
+                    return func(**kwargs)
+                read_from_primary(kwargs["db"])
+
+            value = jsonable_encoder(func(**kwargs))
+            try:
+                response_cache.set(key, value, entry_tags, ttl)
+            except Exception as e:
+                print(f"[CACHE] Store failed for {key}: {e}")
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,195 @@
+"""
+Check that the hot queries are served by their indexes
+
+Runs EXPLAIN on the queries behind the feed, profile, messaging,
+notification and commission endpoints and verifies each plan reads
+through the index added for it (see the add_hot_query_indexes
+migration). Sequential scans are disabled for the check, since on a
+small development database the planner would rightly prefer them; the
+question answered here is whether the index can serve the query shape.
+
+Exits with status 1 if any query does not use its index.
+
+    python check_query_plans.py
+"""
+
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import func, select, text, union_all, update
+from sqlalchemy.orm import Session
+
+from models import (
+    ArtRequest, Comment, CommissionStatus, Conversation, Follow, Message, Notification,
+    PortfolioItem, Post, PostTag, Review, Upvote, User
+)
+from pagination import encode_cursor, paginate
+
+USER_ID = 1
+OTHER_USER_ID = 2
+POST_ID = 1
+LIMIT = 20
+
+def hot_queries():
+    """(description, statement, index names any of which satisfies the check)"""
+    cursor = encode_cursor(datetime.utcnow(), 1)
+    feed = select(Post, User).join(User, Post.author_id == User.id)
+    conversation = select(Message).where(
+        ((Message.sender_id == USER_ID) & (Message.receiver_id == OTHER_USER_ID)) |
+        ((Message.sender_id == OTHER_USER_ID) & (Message.receiver_id == USER_ID))
+    )
+    notifications = select(Notification.id, Notification.message, Notification.created_at).where(
+        Notification.user_id == USER_ID
+    )
+    commissions = select(ArtRequest, User).join(User, ArtRequest.requester_id == User.id)
+    conversation_sides = union_all(
+        select(Conversation.user_high_id.label("other_id"), Conversation.last_message_at)
+        .where(Conversation.user_low_id == USER_ID),
+        select(Conversation.user_low_id, Conversation.last_message_at)
+        .where(Conversation.user_high_id == USER_ID)
+    ).subquery()
+
+    return [
+        ("feed first page", paginate(feed, Post.created_at, Post.id, LIMIT), {"ix_posts_created_id"}),
+        ("feed next page", paginate(feed, Post.created_at, Post.id, LIMIT, cursor=cursor), {"ix_posts_created_id"}),
+        (
+            "feed filtered by tag",
+            paginate(
+                feed.join(PostTag, Post.id == PostTag.post_id).where(PostTag.tag.in_(["Art Showcase"])),
+                Post.created_at, Post.id, LIMIT
+            ),
+            {"ix_post_tags_tag_post", "ix_posts_created_id"}
+        ),
+        (
+            "posts by author",
+            select(Post.id, Post.created_at).where(Post.author_id == USER_ID).order_by(Post.created_at.desc()),
+            {"ix_posts_author_created"}
+        ),
+        (
+            "comments on a post",
+            select(Comment).where(Comment.post_id == POST_ID).order_by(Comment.created_at.asc()),
+            {"ix_comments_post_created"}
+        ),
+        (
+            "upvotes on a post",
+            select(func.count()).select_from(Upvote).where(Upvote.post_id == POST_ID),
+            {"ix_upvotes_post"}
+        ),
+        (
+            "conversation page",
+            paginate(conversation, Message.created_at, Message.id, LIMIT, cursor=cursor),
+            {"ix_messages_pair_created_id"}
+        ),
+        (
+            "conversation list",
+            select(conversation_sides).order_by(conversation_sides.c.last_message_at.desc()),
+            {"ix_conversations_low_last_message", "ix_conversations_high_last_message"}
+        ),
+        (
+            "mark conversation read",
+            update(Message)
+            .where(Message.sender_id == OTHER_USER_ID, Message.receiver_id == USER_ID, Message.is_read == False)
+            .values(is_read=True),
+            {"ix_messages_unread"}
+        ),
+        (
+            "notifications page",
+            paginate(notifications, Notification.created_at, Notification.id, LIMIT, cursor=cursor),
+            {"ix_notifications_user_created_id"}
+        ),
+        (
+            "mark all notifications read",
+            update(Notification)
+            .where(Notification.user_id == USER_ID, Notification.is_read == False)
+            .values(is_read=True),
+            {"ix_notifications_unread"}
+        ),
+        (
+            "followers count",
+            select(func.count()).select_from(Follow).where(Follow.following_id == USER_ID),
+            {"ix_follows_following_follower"}
+        ),
+        (
+            "reviews for an artist",
+            select(Review).where(Review.artist_id == USER_ID).order_by(Review.created_at.desc()),
+            {"ix_reviews_artist_created"}
+        ),
+        (
+            "portfolio for an artist",
+            select(PortfolioItem).where(PortfolioItem.artist_id == USER_ID).order_by(PortfolioItem.created_at.desc()),
+            {"ix_portfolio_items_artist_created"}
+        ),
+        (
+            "commissions",
+            paginate(commissions, ArtRequest.created_at, ArtRequest.id, LIMIT),
+            {"ix_art_requests_created_id"}
+        ),
+        (
+            "commissions by status",
+            paginate(
+                commissions.where(ArtRequest.status == CommissionStatus.OPEN),
+                ArtRequest.created_at, ArtRequest.id, LIMIT
+            ),
+            {"ix_art_requests_status_created_id"}
+        ),
+        (
+            "my commissions",
+            paginate(
+                commissions.where(ArtRequest.requester_id == USER_ID),
+                ArtRequest.created_at, ArtRequest.id, LIMIT
+            ),
+            {"ix_art_requests_requester_created_id"}
+        ),
+    ]
+
+def _index_names(plan):
+    """Every index a plan node or its children reads"""
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+def explain(db: Session, statement):
+    """Return the JSON plan for statement without running it"""
+    compiled = statement.compile(bind=db.get_bind(), compile_kwargs={"literal_binds": True})
+    result = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"]
+
+def check_query_plans(db: Session):
+    """
+    EXPLAIN each hot query and compare the indexes it uses with the expected ones
+
+    Returns:
+        list: (description, expected index names, used index names) for queries that missed
+    """
+    failures = []
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    try:
+        for description, statement, expected in hot_queries():
+            used = _index_names(explain(db, statement))
+            if used & expected:
+                print(f"[PLAN] ok    {description}: {', '.join(sorted(used & expected))}")
+            else:
+                print(f"[PLAN] MISS  {description}: expected {', '.join(sorted(expected))}, used {', '.join(sorted(used)) or 'no index'}")
+                failures.append((description, expected, used))
+    finally:
+        db.rollback()
+    return failures
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        failures = check_query_plans(db)
+    finally:
+        db.close()
+    if failures:
+        print(f"[PLAN] {len(failures)} hot queries are not using their indexes")
+        sys.exit(1)
+    print("[PLAN] All hot queries use their indexes")
@@ -2,11 +2,13 @@
 Comment notification helper functions
 
 These functions handle the automatic creation of notifications
-when comments are posted.
+when comments are posted. Notifications are queued on the outbox
+and written by its background worker.
 """
 
-from notification_service import NotificationService
+from notification_outbox import notify_comment
 from models import Comment, Post, User
+from post_counters import adjust_comment_count
 from sqlalchemy.orm import Session
 
 def create_comment_with_notification(
@@ -35,24 +37,13 @@ def create_comment_with_notification(
     )
     
     db.add(comment)
+    db.flush()
+    adjust_comment_count(db, post_id, 1)
     db.commit()
     db.refresh(comment)
     
-    # Create notification
-    notification_service = NotificationService(db)
-    
-    try:
-        # Create notification for the post author
-        notification_service.create_comment_notification(
-            commenter_id=author_id,
-            post_id=post_id,
-            comment_id=comment.id
-        )
-    
-    except Exception as e:
-        print(f"Error creating notification: {e}")
-        # Don't fail the comment creation if notification fails
-        pass
+    # Notify the post author; written in the background
+    notify_comment(author_id, post_id)
     
     return comment
 
@@ -0,0 +1,123 @@
+"""
+In-process pub/sub for server-pushed events
+
+Streaming endpoints (SSE, WebSocket) subscribe to a channel such as
+"user:42" and receive every event published to it. Handlers publish
+from sync code running in the threadpool; events are handed to each
+subscriber's event loop with call_soon_threadsafe.
+
+Brokers:
+    local   Events only reach subscribers on this worker (default)
+    redis   Events are relayed through Redis pub/sub so every worker
+            sees them. Selected with EVENT_BROKER=redis and requires
+            the optional `redis` package.
+"""
+
+import asyncio
+import json
+import os
+import threading
+
+EVENT_BROKER = os.getenv("EVENT_BROKER", "local")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+REDIS_CHANNEL_PREFIX = "artspire:"
+
+class EventHub:
+    """Delivers events to subscribers connected to this worker"""
+
+    def __init__(self):
+        self._subscribers = {}  # channel -> set of (loop, queue)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str):
+        """Register a subscriber; must be called from the subscriber's event loop"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(entry)
+        return queue
+
+    def unsubscribe(self, channel: str, queue):
+        with self._lock:
+            entries = self._subscribers.get(channel, set())
+            entries.difference_update({e for e in entries if e[1] is queue})
+            if not entries:
+                self._subscribers.pop(channel, None)
+
+    def deliver(self, channel: str, event: dict):
+        with self._lock:
+            entries = list(self._subscribers.get(channel, ()))
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has already shut down
+                self.unsubscribe(channel, queue)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._subscribers.values())
+
+def _offer(queue, event):
+    # Slow consumers lose their oldest events rather than blocking publishers
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+class LocalBroker:
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+
+    def publish(self, channel: str, event: dict):
+        self.hub.deliver(channel, event)
+
+class RedisBroker:
+    """Relays events between workers through Redis pub/sub"""
+
+    def __init__(self, hub: EventHub, url: str):
+        import redis
+
+        self.hub = hub
+        self.client = redis.Redis.from_url(url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    def publish(self, channel: str, event: dict):
+        self.client.publish(f"{REDIS_CHANNEL_PREFIX}{channel}", json.dumps(event, default=str))
+
+    def _listen(self):
+        for message in self.pubsub.listen():
+            try:
+                channel = message["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+                self.hub.deliver(channel, json.loads(message["data"]))
+            except Exception as e:
+                print(f"[EVENTS] Failed to relay message: {e}")
+
+def _make_broker(hub: EventHub):
+    if EVENT_BROKER == "redis":
+        try:
+            return RedisBroker(hub, REDIS_URL)
+        except ImportError:
+            print("[EVENTS] redis package not installed, falling back to local broker")
+    return LocalBroker(hub)
+
+hub = EventHub()
+broker = _make_broker(hub)
+
+def user_channel(user_id: int):
+    return f"user:{user_id}"
+
+def messages_channel(user_id: int):
+    return f"messages:{user_id}"
+
+def publish(channel: str, event: dict):
+    """Publish an event; failures are logged and never raised to the caller"""
+    try:
+        broker.publish(channel, event)
+    except Exception as e:
+        print(f"[EVENTS] Failed to publish to {channel}: {e}")
@@ -0,0 +1,109 @@
+"""
+Feed hydration helpers
+
+These functions turn a page of (Post, User) rows into the post
+dictionaries returned by the feed endpoints. Counts come from the
+denormalized columns on Post; viewer flags and tags for the page are
+resolved with a fixed number of IN queries instead of several queries
+per post.
+"""
+
+from image_derivatives import image_srcset
+from models import Follow, Post, PostTag, Upvote, User
+from pagination import paginate, page_results
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+def hydrate_posts(db: Session, posts_with_users, current_user: User = None):
+    """
+    Build feed post dictionaries for a page of posts
+
+    Args:
+        db: Database session
+        posts_with_users: Sequence of (Post, User) rows, already ordered
+        current_user: The viewing user, or None for anonymous viewers
+
+    Returns:
+        list: Post dictionaries in the same order as posts_with_users
+    """
+    rows = list(posts_with_users)
+    if not rows:
+        return []
+
+    post_ids = [post.id for post, _ in rows]
+    author_ids = {user.id for _, user in rows}
+
+    tags_by_post = {post_id: [] for post_id in post_ids}
+    for post_id, tag in db.execute(
+        select(PostTag.post_id, PostTag.tag).where(PostTag.post_id.in_(post_ids))
+    ).all():
+        tags_by_post[post_id].append(tag)
+
+    upvoted_ids = set()
+    followed_ids = set()
+    if current_user:
+        upvoted_ids = set(db.execute(
+            select(Upvote.post_id).where(
+                Upvote.user_id == current_user.id,
+                Upvote.post_id.in_(post_ids)
+            )
+        ).scalars().all())
+
+        followed_ids = set(db.execute(
+            select(Follow.following_id).where(
+                Follow.follower_id == current_user.id,
+                Follow.following_id.in_(author_ids)
+            )
+        ).scalars().all())
+
+    feed_posts = []
+    for post, user in rows:
+        is_own_post = current_user.id == user.id if current_user else False
+        feed_posts.append({
+            "id": post.id,
+            "content": post.content,
+            "image_url": post.image_url,
+            "image_srcset": image_srcset(post.image_url),
+            "tags": tags_by_post[post.id],
+            "upvotes": post.upvote_count or 0,
+            "has_upvoted": post.id in upvoted_ids,
+            "created_at": post.created_at,
+            "comment_count": post.comment_count or 0,
+            "author": {
+                "id": user.id,
+                "username": user.username,
+                "avatar_url": user.avatar_url
+            },
+            "is_following": not is_own_post and user.id in followed_ids,
+            "is_own_post": is_own_post
+        })
+
+    return feed_posts
+
+def load_feed_page(db: Session, limit: int = 20, tags: str = None, cursor: str = None, skip: int = 0, current_user=None):
+    """
+    Load and hydrate one page of the global feed
+
+    Args:
+        tags: Comma separated tag filter
+        cursor: Cursor returned with the previous page, if any
+        skip: Offset for clients that do not use cursors
+
+    Returns:
+        dict: {"posts": [...], "next_cursor": ...}
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = select(Post, User).join(User, Post.author_id == User.id)
+
+    # Filter posts that have any of the comma separated tags
+    tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()] if tags else []
+    if tag_list:
+        query = query.join(PostTag, Post.id == PostTag.post_id).where(PostTag.tag.in_(tag_list))
+
+    query = paginate(query, Post.created_at, Post.id, limit, cursor=cursor, skip=skip)
+    posts_with_users, next_cursor = page_results(
+        db.execute(query).all(), limit, lambda row: (row[0].created_at, row[0].id)
+    )
+    return {"posts": hydrate_posts(db, posts_with_users, current_user), "next_cursor": next_cursor}
@@ -0,0 +1,223 @@
+"""
+Resized WebP copies of uploaded images
+
+Each stored image gets copies at DERIVATIVE_WIDTHS pixels wide, encoded
+as WebP and stored next to the original under
+derived/{width}/{original key}.webp. Post and portfolio responses carry
+an "image_srcset" map of width -> URL built by image_srcset(), so
+galleries can load the smallest file that fills a grid cell instead of
+the full-resolution original.
+
+Resizing and encoding run in a process pool so they neither hold the
+API worker's GIL nor delay the upload response. Workers are handed only
+the original's key and read it from storage themselves, so the API
+process never holds image bytes for queued work:
+    - uploads call schedule_derivatives() to render them in the background
+    - GET /media/derived/... renders a missing one on first request, which
+      also covers images uploaded before derivatives existed
+
+At most DERIVATIVE_QUEUE_LIMIT originals are queued at once. Beyond that
+uploads skip background rendering and the derivatives are made on first
+request instead. That request waits up to DERIVATIVE_TIMEOUT seconds
+without holding a thread; if the derivative is still not ready, or the
+queue is full, it is redirected to the original image.
+
+Once this API process knows an image's derivatives are stored,
+image_srcset() points at the storage backend's own URLs, so the API is
+only involved for derivatives that may still be missing.
+
+Requires the optional Pillow package. Without it image_srcset() returns
+None and uploads are stored as before.
+"""
+
+import asyncio
+import importlib.util
+import io
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+
+from storage import STORAGE_PUBLIC_BASE_URL, storage
+
+DERIVATIVE_WIDTHS = sorted(int(width) for width in os.getenv("DERIVATIVE_WIDTHS", "320,640,1280").split(","))
+DERIVATIVE_QUALITY = int(os.getenv("DERIVATIVE_QUALITY", "80"))
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+# Seconds a first request waits for its derivative before getting the original
+DERIVATIVE_TIMEOUT = float(os.getenv("DERIVATIVE_TIMEOUT", "30"))
+# Originals waiting for or being rendered at once
+DERIVATIVE_QUEUE_LIMIT = int(os.getenv("DERIVATIVE_QUEUE_LIMIT", "64"))
+# Originals remembered as rendered, for image_srcset
+_RENDERED_LIMIT = 10000
+
+# Formats worth resizing; GIFs would lose their animation and SVGs scale anyway
+_RESIZABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+_DERIVATIVE_KEY = re.compile(r"^derived/(\d+)/(.+)\.webp$")
+
+DERIVATIVES_ENABLED = importlib.util.find_spec("PIL") is not None
+if not DERIVATIVES_ENABLED:
+    print("[IMAGES] Pillow package not installed, image derivatives disabled")
+
+def render_derivatives(data: bytes, widths, quality: int):
+    """
+    Decode an image once and encode a WebP copy for each width
+
+    Runs in a worker process. Images narrower than a width are not
+    upscaled; that entry is just the image at its own size.
+
+    Returns:
+        dict: width -> WebP bytes
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    rendered = {}
+    for width in widths:
+        resized = image.copy()
+        resized.thumbnail((width, width * 10), Image.LANCZOS)
+        out = io.BytesIO()
+        resized.save(out, "WEBP", quality=quality, method=4)
+        rendered[width] = out.getvalue()
+    return rendered
+
+def render_and_store(key: str, widths, quality: int):
+    """Read an original from storage and store its derivatives; runs in a worker process"""
+    rendered = render_derivatives(storage.get(key), widths, quality)
+    for width, body in rendered.items():
+        storage.put(derivative_key(key, width), io.BytesIO(body), "image/webp")
+    print(f"[IMAGES] Stored {len(rendered)} derivatives of {key}")
+
+def derivative_key(key: str, width: int) -> str:
+    return f"derived/{width}/{key}.webp"
+
+def derivative_original(key: str):
+    """Key of the original a derivative key was made from, None for other keys"""
+    match = _DERIVATIVE_KEY.match(key)
+    if not match or int(match.group(1)) not in DERIVATIVE_WIDTHS:
+        return None
+    return match.group(2)
+
+def is_resizable(key: str) -> bool:
+    return os.path.splitext(key)[1].lower() in _RESIZABLE_EXTENSIONS and not key.startswith("derived/")
+
+def image_srcset(image_url: str):
+    """
+    Map of width -> derivative URL for an image stored by this app
+
+    Derivatives known to be stored are linked at the backend's public
+    URL. Others point at /media, which renders a derivative the first
+    time it is requested, so the map is valid even before rendering
+    finishes.
+
+    Returns:
+        dict or None: None for external URLs, non-resizable formats, or
+        when Pillow is unavailable
+    """
+    if not DERIVATIVES_ENABLED or not image_url:
+        return None
+    key = storage.key_for_url(image_url)
+    if key is None or not is_resizable(key):
+        return None
+    if key in _rendered:
+        return {str(width): storage.public_url(derivative_key(key, width)) for width in DERIVATIVE_WIDTHS}
+    return {str(width): f"{STORAGE_PUBLIC_BASE_URL}/{derivative_key(key, width)}" for width in DERIVATIVE_WIDTHS}
+
+_process_pool = None
+_in_flight = {}  # original key -> Future
+_rendered = {}  # original keys whose derivatives are stored, oldest first
+_lock = threading.RLock()  # done callbacks may run while it is held
+
+def _get_process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            # spawn, because forking a process that runs threads can deadlock the child
+            _process_pool = ProcessPoolExecutor(
+                max_workers=DERIVATIVE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+def _mark_rendered(key: str):
+    with _lock:
+        _rendered[key] = True
+        if len(_rendered) > _RENDERED_LIMIT:
+            del _rendered[next(iter(_rendered))]
+
+def _finished(key: str, future):
+    with _lock:
+        _in_flight.pop(key, None)
+    if not future.cancelled() and future.exception() is None:
+        _mark_rendered(key)
+
+def schedule_derivatives(key: str):
+    """
+    Render and store every derivative of key in the background
+
+    Concurrent calls for the same key share one rendering.
+
+    Args:
+        key: Storage key of the original image
+
+    Returns:
+        Future or None: Resolves once all derivatives are stored; None
+        when DERIVATIVE_QUEUE_LIMIT originals are already queued
+    """
+    with _lock:
+        future = _in_flight.get(key)
+        if future is None:
+            if len(_in_flight) >= DERIVATIVE_QUEUE_LIMIT:
+                print(f"[IMAGES] Render queue full, deferring derivatives of {key}")
+                return None
+            future = _in_flight[key] = _get_process_pool().submit(
+                render_and_store, key, DERIVATIVE_WIDTHS, DERIVATIVE_QUALITY
+            )
+            future.add_done_callback(lambda done: _finished(key, done))
+    return future
+
+async def ensure_derivative(key: str) -> bool:
+    """
+    Make sure the derivative stored under key exists, rendering it if needed
+
+    Awaits the rendering on the event loop, so waiting requests do not
+    hold threadpool threads that other handlers need.
+
+    Returns:
+        bool: False if the derivative is not ready yet, because the
+        render queue is full or rendering takes longer than
+        DERIVATIVE_TIMEOUT; it keeps rendering in the background
+
+    Raises:
+        FileNotFoundError: If key is not a derivative of a stored image or
+            it could not be rendered
+    """
+    original = derivative_original(key) if DERIVATIVES_ENABLED else None
+    if original is None:
+        raise FileNotFoundError(key)
+    if not is_resizable(original) or original in _rendered:
+        return True
+    if await run_in_threadpool(storage.exists, key):
+        _mark_rendered(original)
+        return True
+    future = schedule_derivatives(original)
+    if future is None:
+        return False
+    try:
+        # Shielded, so a timeout here does not cancel the shared rendering
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), DERIVATIVE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return False
+    except Exception as e:
+        print(f"[IMAGES] Could not render derivatives of {original}: {e}")
+        raise FileNotFoundError(key)
+    return True
+
+def shutdown_derivatives():
+    """Wait for queued renderings and stop the worker processes"""
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True)
@@ -1,28 +1,41 @@
-from fastapi import FastAPI, Form, Depends, UploadFile, File as FastAPIFile
+from fastapi import FastAPI, Form, Depends, Header, Query, UploadFile, Request, Response, WebSocket, WebSocketDisconnect, File as FastAPIFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select, func, text, delete
 
 from fastapi import HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from auth import create_access_token, verify_token, SECRET_KEY, ALGORITHM
+from auth import create_access_token, CurrentUser, get_current_user, get_current_user_from_query, get_optional_current_user, identity_from_token, invalidate_identity, require_ops_access
 from datetime import timedelta
 
-from jose import jwt, JWTError
-
 from passlib.context import CryptContext
+import asyncio
 import json
 import os
-import time
-import re
 
-from models import User, Base, Post, PortfolioItem, ArtRequest, Comment, Review, Follow, Message, Notification, UserTag, PostTag, Upvote, CommissionStatus
-from database import engine, SessionLocal
-from schemas import UserCreate, UserInDB, PostCreate, PostUpdate, PortfolioItemCreate, ArtRequestCreate, CommentCreate, CommentUpdate, ReviewCreate, UserUpdate, MessageCreate, Message as MessageSchema, Notification as NotificationSchema, NotificationEvent, NotificationWithDetails
-from supabase import create_client, Client
+from models import User, Base, Post, PortfolioItem, ArtRequest, Comment, Review, Follow, Message, Notification, UserTag, PostTag, Upvote, TimelineEntry, CommissionStatus
+from database import engine, SessionLocal, get_db, use_read_replica, DB_ASYNC, pool_stats
+from schemas import UserCreate, UserInDB, PostCreate, PostUpdate, PortfolioItemCreate, ArtRequestCreate, CommentCreate, CommentUpdate, ReviewCreate, UserUpdate, MessageCreate, Notification as NotificationSchema, NotificationEvent, NotificationWithDetails
 from notification_service import NotificationService
+from notification_outbox import notification_outbox, notify_follow, notify_post_reaction
 from comment_helpers import create_comment_with_notification, get_comment_with_notifications
+from feed_hydration import hydrate_posts, load_feed_page
+from pagination import MAX_PAGE_SIZE, paginate, page_results
+from post_counters import adjust_upvote_count, adjust_comment_count
+from timeline import fan_out_post, add_author_to_timeline, remove_author_from_timeline, get_timeline_page
+from cache import cached, response_cache
+from query_metrics import QueryCounterMiddleware, query_stats
+from metrics import RequestMetricsMiddleware, render_metrics
+from profile_page import parse_fields, build_profile_page, profile_section, posts_section, portfolio_section, follow_section, reviews_section, review_stats_section
+from user_counters import get_unread_messages
+from uploads import store_upload, upload_image, UploadTooLargeError
+from resumable_uploads import ChunkWriter, UploadConflictError, UploadNotFoundError, create_upload, get_upload, complete_upload, delete_upload
+from storage import storage
+from image_derivatives import derivative_original, ensure_derivative, image_srcset, shutdown_derivatives
+from events import hub, user_channel, messages_channel
+from message_helpers import create_message, get_message_page, mark_conversation_read, mark_message_read, get_conversation_list, publish_delivery_receipt
 
 from typing import List
 
@@ -35,15 +48,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 print("[INFO] CORS middleware added.")
 
-# --- Supabase config (using environment variables) ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "artwork")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
+# Counts SQL statements per request and warns about repeated statements (N+1)
+app.add_middleware(QueryCounterMiddleware)
+# Per-route request counts, latency histograms and in-flight requests for /metrics
+app.add_middleware(RequestMetricsMiddleware)
 
+# With DB_ASYNC=true the hot endpoints run on the asyncpg engine; the
+# router is included before the sync routes below so it takes precedence
+if DB_ASYNC:
+    from async_endpoints import router as async_router
+    app.include_router(async_router)
+    print("[INFO] Async database endpoints enabled.")
 
 
 # Hashing configuration
@@ -55,17 +74,16 @@ def hash_password(password: str):
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @app.on_event("startup")
 def startup():
     Base.metadata.create_all(bind=engine)
+    notification_outbox.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    # Write any notifications still waiting in the outbox
+    notification_outbox.flush()
+    shutdown_derivatives()
 
 @app.post("/login")
 def login(username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
@@ -77,98 +95,80 @@ def login(username: str = Form(...), password: str = Form(...), db: Session = De
     print("TOKEN SENT:", token)
     return {"access_token": token, "token_type": "bearer"}
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
-
 @app.get("/protected")
-def protected_route(token: str = Depends(oauth2_scheme)):
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return {"message": f"Hello, {username}!"}
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+def protected_route(current_user: CurrentUser = Depends(get_current_user)):
+    return {"message": f"Hello, {current_user.username}!"}
 
 @app.get("/profile")
-def get_profile(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        
-        # Get user from database
-        user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+def get_profile(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    # The identity only carries id/username/avatar, load the full row
+    user = db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
 
-        # Get user skills from UserTag table
-        user_tags = db.execute(select(UserTag).where(UserTag.user_id == user.id)).scalars().all()
-        skills = [tag.tag for tag in user_tags]
+    # Get user skills from UserTag table
+    user_tags = db.execute(select(UserTag).where(UserTag.user_id == user.id)).scalars().all()
+    skills = [tag.tag for tag in user_tags]
 
-        return {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "bio": user.bio or "No bio available",
-            "avatar_url": user.avatar_url,
-            "skills": skills,
-            "created_at": user.created_at
-        }
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "bio": user.bio or "No bio available",
+        "avatar_url": user.avatar_url,
+        "skills": skills,
+        "created_at": user.created_at
+    }
 
 @app.patch("/profile")
 def update_profile(
     user_update: UserUpdate,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        # Update fields if provided
-        if user_update.username is not None:
-            user.username = user_update.username
-        if user_update.bio is not None:
-            user.bio = user_update.bio
-        if user_update.avatar_url is not None:
-            user.avatar_url = user_update.avatar_url
-        if user_update.skills is not None:
-            # Delete existing user tags
-            db.execute(delete(UserTag).where(UserTag.user_id == user.id))
-            # Add new tags
-            if isinstance(user_update.skills, list):
-                for skill in user_update.skills:
-                    if skill.strip():  # Only add non-empty skills
-                        new_tag = UserTag(user_id=user.id, tag=skill.strip())
-                        db.add(new_tag)
-            elif isinstance(user_update.skills, str):
-                # Handle comma-separated string
-                skills_list = [s.strip() for s in user_update.skills.split(',') if s.strip()]
-                for skill in skills_list:
-                    new_tag = UserTag(user_id=user.id, tag=skill)
+    user = db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    # Update fields if provided
+    if user_update.username is not None:
+        user.username = user_update.username
+    if user_update.bio is not None:
+        user.bio = user_update.bio
+    if user_update.avatar_url is not None:
+        user.avatar_url = user_update.avatar_url
+    if user_update.skills is not None:
+        # Delete existing user tags
+        db.execute(delete(UserTag).where(UserTag.user_id == user.id))
+        # Add new tags
+        if isinstance(user_update.skills, list):
+            for skill in user_update.skills:
+                if skill.strip():  # Only add non-empty skills
+                    new_tag = UserTag(user_id=user.id, tag=skill.strip())
                     db.add(new_tag)
-        
-        db.commit()
-        db.refresh(user)
-        
-        # Get updated skills
-        user_tags = db.execute(select(UserTag).where(UserTag.user_id == user.id)).scalars().all()
-        skills = [tag.tag for tag in user_tags]
-        return {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "bio": user.bio,
-            "avatar_url": user.avatar_url,
-            "skills": skills,
-            "created_at": user.created_at
-        }
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        elif isinstance(user_update.skills, str):
+            # Handle comma-separated string
+            skills_list = [s.strip() for s in user_update.skills.split(',') if s.strip()]
+            for skill in skills_list:
+                new_tag = UserTag(user_id=user.id, tag=skill)
+                db.add(new_tag)
+    
+    db.commit()
+    db.refresh(user)
+    invalidate_identity(current_user.username, user.username)
+    response_cache.invalidate(f"user:{user.id}", "portfolio", "suggested")
+    
+    # Get updated skills
+    user_tags = db.execute(select(UserTag).where(UserTag.user_id == user.id)).scalars().all()
+    skills = [tag.tag for tag in user_tags]
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "bio": user.bio,
+        "avatar_url": user.avatar_url,
+        "skills": skills,
+        "created_at": user.created_at
+    }
 
 @app.post("/register")
 def register(
@@ -195,137 +195,54 @@ def register(
         return {"success": False, "error": "Username or email already exists"}
 
 # Feed/Posts endpoints
-@app.get("/feed")
-def get_feed(skip: int = 0, limit: int = 20, tags: str = None, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the global feed of posts with optional tag filtering"""
-    # Get current user for follow status
-    current_user = None
+@app.get("/feed", dependencies=[Depends(use_read_replica)])
+def get_feed(skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), tags: str = None, cursor: str = None, current_user: CurrentUser = Depends(get_optional_current_user), db: Session = Depends(get_db)):
+    """Get the global feed of posts with optional tag filtering
+
+    Pass the returned next_cursor as cursor to fetch the following page
+    with a keyset range scan; skip is kept for older clients.
+    """
+    # current_user is None for unauthenticated viewers
     try:
-        username = verify_token(token)
-        if username:
-            current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    except:
-        pass  # Allow unauthenticated users to view feed
-    
-    query = select(Post, User).join(User, Post.author_id == User.id)
-    
-    # Filter by tags if provided
-    if tags:
-        # Parse the tags parameter (comma-separated)
-        tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-        if tag_list:
-            # Join with PostTag table to filter by tags
-            query = query.join(PostTag, Post.id == PostTag.post_id)
-            # Filter posts that have any of the specified tags
-            from sqlalchemy import or_
-            tag_conditions = [PostTag.tag.in_(tag_list)]
-            query = query.where(or_(*tag_conditions))
-    
-    posts_with_users = db.execute(
-        query.order_by(Post.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    ).all()
+        return load_feed_page(db, limit=limit, tags=tags, cursor=cursor, skip=skip, current_user=current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/feed/following", dependencies=[Depends(use_read_replica)])
+def get_following_feed(limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), cursor: str = None, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Get posts from artists the current user follows, newest first"""
+    try:
+        posts_with_users, next_cursor = get_timeline_page(db, current_user.id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    feed_posts = []
-    for post, user in posts_with_users:
-        # Get comment count for this post
-        comment_count = db.execute(
-            select(func.count(Comment.id)).where(Comment.post_id == post.id)
-        ).scalar()
-        
-        # Get upvote count for this post
-        upvote_count = db.execute(
-            select(func.count(Upvote.user_id)).where(Upvote.post_id == post.id)
-        ).scalar()
-        
-        # Check if current user has upvoted this post
-        has_upvoted = False
-        if current_user:
-            upvote_record = db.execute(
-                select(Upvote).where(
-                    Upvote.user_id == current_user.id,
-                    Upvote.post_id == post.id
-                )
-            ).scalar_one_or_none()
-            has_upvoted = upvote_record is not None
-        
-        # Check if current user is following this post's author
-        is_following = False
-        if current_user and current_user.id != user.id:
-            follow_record = db.execute(
-                select(Follow).where(
-                    Follow.follower_id == current_user.id,
-                    Follow.following_id == user.id
-                )
-            ).scalar_one_or_none()
-            is_following = follow_record is not None
-        
-        # Get post tags
-        post_tags = db.execute(select(PostTag).where(PostTag.post_id == post.id)).scalars().all()
-        tags_list = [tag.tag for tag in post_tags]
-        
-        feed_posts.append({
-            "id": post.id,
-            "content": post.content,
-            "image_url": post.image_url,
-            "tags": tags_list,
-            "upvotes": upvote_count or 0,
-            "has_upvoted": has_upvoted,
-            "created_at": post.created_at,
-            "comment_count": comment_count or 0,
-            "author": {
-                "id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url
-            },
-            "is_following": is_following,
-            "is_own_post": current_user.id == user.id if current_user else False
-        })
+    feed_posts = hydrate_posts(db, posts_with_users, current_user)
     
-    return {"posts": feed_posts}
+    return {"posts": feed_posts, "next_cursor": next_cursor}
 
 @app.post("/posts")
-async def create_post(
+def create_post(
     content: str = Form(...),
     image_url: str = Form(None),
     tags: str = Form(None),
     file: UploadFile = FastAPIFile(None),
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new post with optional image upload and tags"""
     try:
         print(f"Creating post with content: '{content[:50]}...', tags: {tags}, has_file: {bool(file and file.filename)}")
         
-        username = verify_token(token)
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        # Get user
-        user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        print(f"User found: {user.username} (ID: {user.id})")
+        print(f"User found: {current_user.username} (ID: {current_user.id})")
         
         # Handle image upload if file is provided
         final_image_url = image_url
         if file and file.filename:
             try:
-                contents = await file.read()
-                # Sanitize filename to remove invalid characters
-                safe_filename = re.sub(r'[^\w\-_\.]', '_', file.filename)
-                if not safe_filename or safe_filename.startswith('.'):
-                    safe_filename = f"image_{int(time.time())}.jpg"
-                filename = f"post_{int(time.time())}_{safe_filename}"
-                print(f"Uploading post image: {filename} to Supabase bucket: {SUPABASE_BUCKET}")
-                res = supabase.storage.from_(SUPABASE_BUCKET).upload(filename, contents, {"content-type": file.content_type, "x-upsert": "true"})
-                if hasattr(res, "error") and res.error is not None:
-                    print("Upload error:", res.error)
-                    raise HTTPException(status_code=500, detail=f"Upload failed: {res.error}")
-                final_image_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{filename}"
+                final_image_url = upload_image(file)
                 print("Post image uploaded successfully:", final_image_url)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
             except Exception as e:
                 print(f"Error uploading post image: {e}")
                 raise HTTPException(status_code=500, detail=f"Image upload failed: {str(e)}")
@@ -333,7 +250,7 @@ async def create_post(
         new_post = Post(
             content=content,
             image_url=final_image_url,
-            author_id=user.id
+            author_id=current_user.id
         )
         
         try:
@@ -366,6 +283,15 @@ async def create_post(
             print(f"Database error creating post: {db_error}")
             raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
         
+        # Push the post into followers' timelines
+        try:
+            fan_out_post(db, new_post)
+            db.commit()
+        except Exception as e:
+            # Log the error but don't fail the post creation
+            db.rollback()
+            print(f"Failed to fan out post {new_post.id}: {e}")
+        
         return {"success": True, "post_id": new_post.id}
     
     except HTTPException:
@@ -379,19 +305,10 @@ async def create_post(
 @app.post("/posts/{post_id}/upvote")
 def upvote_post(
     post_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Toggle upvote for a post"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     post = db.execute(select(Post).where(Post.id == post_id)).scalar_one_or_none()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -406,42 +323,36 @@ def upvote_post(
     
     if existing_upvote:
         # Remove upvote (unlike)
-        db.execute(
+        result = db.execute(
             delete(Upvote).where(
                 Upvote.user_id == current_user.id,
                 Upvote.post_id == post_id
             )
         )
+        # Only decrement if this request actually removed the row
+        if result.rowcount:
+            upvote_count = adjust_upvote_count(db, post_id, -1)
+        else:
+            upvote_count = post.upvote_count
         db.commit()
         
-        # Get new upvote count
-        upvote_count = db.execute(
-            select(func.count(Upvote.user_id)).where(Upvote.post_id == post_id)
-        ).scalar()
-        
         return {"success": True, "upvotes": upvote_count or 0, "has_upvoted": False}
     else:
         # Add upvote
         new_upvote = Upvote(user_id=current_user.id, post_id=post_id)
         db.add(new_upvote)
+        try:
+            db.flush()
+        except IntegrityError:
+            # A concurrent request already added this upvote
+            db.rollback()
+            return {"success": True, "upvotes": post.upvote_count or 0, "has_upvoted": True}
+        upvote_count = adjust_upvote_count(db, post_id, 1)
         db.commit()
         
-        # Create notification for the post author (only if not upvoting own post)
+        # Notify the post author (only if not upvoting own post); written in the background
         if post.author_id != current_user.id:
-            notification_service = NotificationService(db)
-            try:
-                notification_service.create_post_reaction_notification(
-                    reactor_id=current_user.id,
-                    post_id=post_id
-                )
-            except Exception as e:
-                # Log the error but don't fail the upvote operation
-                print(f"Failed to create post reaction notification: {e}")
-        
-        # Get new upvote count
-        upvote_count = db.execute(
-            select(func.count(Upvote.user_id)).where(Upvote.post_id == post_id)
-        ).scalar()
+            notify_post_reaction(current_user.id, post_id)
         
         return {"success": True, "upvotes": upvote_count or 0, "has_upvoted": True}
 
@@ -449,21 +360,10 @@ def upvote_post(
 def update_post(
     post_id: int,
     post_update: PostUpdate,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update a post (only by the post author)"""
-    # Get current user from token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     # Get the post
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
@@ -483,6 +383,7 @@ def update_post(
         "id": post.id,
         "content": post.content,
         "image_url": post.image_url,
+        "image_srcset": image_srcset(post.image_url),
         "created_at": post.created_at,
         "author_id": post.author_id,
         "author": {
@@ -495,21 +396,10 @@ def update_post(
 @app.delete("/posts/{post_id}")
 def delete_post(
     post_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a post (only by the post author)"""
-    # Get current user from token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     # Get the post
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
@@ -526,6 +416,8 @@ def delete_post(
     db.execute(delete(Upvote).where(Upvote.post_id == post_id))
     # Delete post tags
     db.execute(delete(PostTag).where(PostTag.post_id == post_id))
+    # Delete timeline entries
+    db.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id))
     
     # Delete the post
     db.delete(post)
@@ -533,43 +425,17 @@ def delete_post(
     
     return {"message": "Post deleted successfully"}
 # User stats endpoints
-@app.get("/users/{user_id}/posts")
+@app.get("/users/{user_id}/posts", dependencies=[Depends(use_read_replica)])
 def get_user_posts(user_id: int, db: Session = Depends(get_db)):
     """Get posts created by a specific user"""
-    posts = db.execute(
-        select(Post).where(Post.author_id == user_id).order_by(Post.created_at.desc())
-    ).scalars().all()
-    
-    return [{
-        "id": post.id,
-        "content": post.content,
-        "image_url": post.image_url,
-        "created_at": post.created_at.isoformat(),
-        "author_id": post.author_id
-    } for post in posts]
+    return posts_section(db, user_id)
 
 # Portfolio endpoints
-@app.get("/users/{user_id}/portfolio")
+@app.get("/users/{user_id}/portfolio", dependencies=[Depends(use_read_replica)])
+@cached("user_portfolio", tags=lambda user_id, **_: [f"portfolio:{user_id}"])
 def get_user_portfolio(user_id: int, db: Session = Depends(get_db)):
     """Get user's portfolio items"""
-    portfolio_items = db.execute(
-        select(PortfolioItem)
-        .where(PortfolioItem.artist_id == user_id)
-        .order_by(PortfolioItem.created_at.desc())
-    ).scalars().all()
-    
-    items = []
-    for item in portfolio_items:
-        items.append({
-            "id": item.id,
-            "title": item.title,
-            "description": item.description,
-            "image_url": item.image_url,
-            "price": item.price,
-            "created_at": item.created_at
-        })
-    
-    return {"portfolio_items": items}
+    return {"portfolio_items": portfolio_section(db, user_id)}
 
 @app.post("/portfolio")
 def create_portfolio_item(
@@ -577,30 +443,22 @@ def create_portfolio_item(
     description: str = Form(None),
     image_url: str = Form(...),
     price: float = Form(None),
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new portfolio item"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get user
-    user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    print(f"Creating portfolio item for user {user.id} with image_url: {image_url}")
+    print(f"Creating portfolio item for user {current_user.id} with image_url: {image_url}")
     new_item = PortfolioItem(
         title=title,
         description=description,
         image_url=image_url,
         price=price,
-        artist_id=user.id
+        artist_id=current_user.id
     )
     db.add(new_item)
     db.commit()
     db.refresh(new_item)
+    response_cache.invalidate("portfolio", f"portfolio:{current_user.id}")
     print(f"Portfolio item created with ID: {new_item.id}")
     return {"success": True, "item_id": new_item.id}
 
@@ -609,27 +467,23 @@ from fastapi import Response
 @app.delete("/portfolio/{item_id}")
 def delete_portfolio_item(
     item_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a portfolio item (only by owner)"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
     item = db.execute(select(PortfolioItem).where(PortfolioItem.id == item_id)).scalar_one_or_none()
     if not item:
         raise HTTPException(status_code=404, detail="Portfolio item not found")
-    if item.artist_id != user.id:
+    if item.artist_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this item")
     # Optionally: delete image from Supabase Storage here
     db.delete(item)
     db.commit()
+    response_cache.invalidate("portfolio", f"portfolio:{current_user.id}")
     return {"success": True, "message": "Portfolio item deleted"}
 
-@app.get("/portfolio/all")
+@app.get("/portfolio/all", dependencies=[Depends(use_read_replica)])
+@cached("portfolio_all", tags=lambda **_: ["portfolio"])
 def get_all_portfolio_artworks(db: Session = Depends(get_db)):
     """Get all portfolio artworks from all users for the art collection page"""
     portfolio_items = db.execute(
@@ -645,6 +499,7 @@ def get_all_portfolio_artworks(db: Session = Depends(get_db)):
             "title": item.title,
             "description": item.description,
             "image_url": item.image_url,
+            "image_srcset": image_srcset(item.image_url),
             "price": item.price,
             "created_at": item.created_at,
             "user": {
@@ -658,13 +513,14 @@ def get_all_portfolio_artworks(db: Session = Depends(get_db)):
     return {"artworks": artworks}
 
 # Commission/Art Request endpoints
-@app.get("/commissions")
+@app.get("/commissions", dependencies=[Depends(use_read_replica)])
 def get_commissions(
     status: str = None,
     my_commissions: bool = False,
-    skip: int = 0,
-    limit: int = 20,
-    token: str = Depends(oauth2_scheme_optional),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    current_user: CurrentUser = Depends(get_optional_current_user),
     db: Session = Depends(get_db)
 ):
     """Get art requests/commissions"""
@@ -673,16 +529,17 @@ def get_commissions(
     if status:
         query = query.where(ArtRequest.status == CommissionStatus(status))
     
-    if my_commissions and token:
-        username = verify_token(token)
-        if username:
-            user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-            if user:
-                query = query.where(ArtRequest.requester_id == user.id)
+    if my_commissions and current_user:
+        query = query.where(ArtRequest.requester_id == current_user.id)
     
-    commissions_with_users = db.execute(
-        query.order_by(ArtRequest.created_at.desc()).offset(skip).limit(limit)
-    ).all()
+    try:
+        query = paginate(query, ArtRequest.created_at, ArtRequest.id, limit, cursor=cursor, skip=skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    commissions_with_users, next_cursor = page_results(
+        db.execute(query).all(), limit, lambda row: (row[0].created_at, row[0].id)
+    )
     
     commissions = []
     for commission, user in commissions_with_users:
@@ -700,31 +557,22 @@ def get_commissions(
             }
         })
     
-    return {"commissions": commissions}
+    return {"commissions": commissions, "next_cursor": next_cursor}
 
 @app.post("/commissions")
 def create_commission(
     title: str = Form(...),
     description: str = Form(...),
     budget: float = Form(None),
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new art request/commission"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get user
-    user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     new_commission = ArtRequest(
         title=title,
         description=description,
         budget=budget,
-        requester_id=user.id,
+        requester_id=current_user.id,
         status=CommissionStatus.OPEN
     )
     db.add(new_commission)
@@ -753,26 +601,17 @@ def update_commission(
     description: str = Form(None),
     budget: float = Form(None),
     status: str = Form(None),
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update a commission (only by the requester)"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get user
-    user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     # Get commission
     commission = db.execute(select(ArtRequest).where(ArtRequest.id == commission_id)).scalar_one_or_none()
     if not commission:
         raise HTTPException(status_code=404, detail="Commission not found")
     
     # Check if user owns the commission
-    if commission.requester_id != user.id:
+    if commission.requester_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only edit your own commissions")
     
     # Update fields
@@ -800,11 +639,12 @@ def update_commission(
     }}
 
 # User search and discovery
-@app.get("/users/search")
+@app.get("/users/search", dependencies=[Depends(use_read_replica)])
 def search_users(
     q: str = None,
-    skip: int = 0,
-    limit: int = 20,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
     db: Session = Depends(get_db)
 ):
     """Search for users by username, bio, or skills"""
@@ -822,7 +662,14 @@ def search_users(
             UserTag.tag.ilike(search_term)
         ))
     
-    users = db.execute(query.offset(skip).limit(limit)).scalars().all()
+    try:
+        query = paginate(query.distinct(), User.created_at, User.id, limit, cursor=cursor, skip=skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    users, next_cursor = page_results(
+        db.execute(query).scalars().all(), limit, lambda user: (user.created_at, user.id)
+    )
     
     user_list = []
     for user in users:
@@ -839,18 +686,16 @@ def search_users(
             "created_at": user.created_at
         })
     
-    return {"users": user_list}
+    return {"users": user_list, "next_cursor": next_cursor}
 
-@app.get("/users/suggested")
-def get_suggested_users(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme_optional)):
+@app.get("/users/suggested", dependencies=[Depends(use_read_replica)])
+def get_suggested_users(db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_optional_current_user)):
     """Get top 3 artists by follower count for suggestions"""
-    # Get current user if token is provided
-    current_user = None
-    if token:
-        username = verify_token(token)
-        if username:
-            current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    
+    return _suggested_users(viewer_id=current_user.id if current_user else None, db=db)
+
+@cached("suggested_users", tags=lambda **_: ["suggested"])
+def _suggested_users(viewer_id: int = None, db: Session = None):
+    # Keyed on the viewer's id, so every session of a user shares one entry
     # Query to get users with their follower counts, excluding current user
     query = """
         SELECT u.id, u.username, u.bio, u.avatar_url, 
@@ -861,8 +706,8 @@ def get_suggested_users(db: Session = Depends(get_db), token: str = Depends(oaut
     """
     
     # Exclude current user if logged in
-    if current_user:
-        query += f" AND u.id != {current_user.id}"
+    if viewer_id is not None:
+        query += f" AND u.id != {viewer_id}"
     
     query += """
         GROUP BY u.id, u.username, u.bio, u.avatar_url
@@ -880,10 +725,10 @@ def get_suggested_users(db: Session = Depends(get_db), token: str = Depends(oaut
         
         # Check if current user is already following this user
         is_following = False
-        if current_user:
+        if viewer_id is not None:
             follow_record = db.execute(
                 select(Follow).where(
-                    Follow.follower_id == current_user.id,
+                    Follow.follower_id == viewer_id,
                     Follow.following_id == row.id
                 )
             ).scalar_one_or_none()
@@ -901,7 +746,8 @@ def get_suggested_users(db: Session = Depends(get_db), token: str = Depends(oaut
     
     return {"suggested_users": suggested_users}
 
-@app.get("/users/{user_id}")
+@app.get("/users/{user_id}", dependencies=[Depends(use_read_replica)])
+@cached("user_profile", tags=lambda user_id, **_: [f"user:{user_id}"])
 def get_user_profile(user_id: int, db: Session = Depends(get_db)):
     """Get public user profile"""
     user = db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
@@ -909,75 +755,88 @@ def get_user_profile(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get user skills from UserTag table
-    user_tags = db.execute(select(UserTag).where(UserTag.user_id == user.id)).scalars().all()
-    skills = [tag.tag for tag in user_tags]
+    return profile_section(db, user)
+
+@app.get("/users/{user_id}/page", dependencies=[Depends(use_read_replica)])
+def get_user_page(
+    user_id: int,
+    fields: str = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_optional_current_user)
+):
+    """Everything a profile page renders, in one request
+
+    fields is a comma separated subset of profile, posts, portfolio_items,
+    follow_stats, is_following, reviews and review_stats; all sections
+    are returned when it is omitted.
+    """
+    try:
+        requested = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {
-        "id": user.id,
-        "username": user.username,
-        "bio": user.bio,
-        "avatar_url": user.avatar_url,
-        "skills": skills,
-        "created_at": user.created_at
-    }
+    page = build_profile_page(db, user_id, requested, viewer_id=current_user.id if current_user else None)
+    if page is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return page
 
+# Avatars uploaded before the storage backends were introduced
 AVATAR_DIR = os.path.join(os.path.dirname(__file__), "avatars")
 os.makedirs(AVATAR_DIR, exist_ok=True)
 from fastapi.staticfiles import StaticFiles
 app.mount("/avatars", StaticFiles(directory=AVATAR_DIR), name="avatars")
 
+@app.get("/media/{key:path}")
+async def get_media(key: str):
+    """Serve a stored upload, or redirect to it when the backend hosts files itself"""
+    try:
+        if key.startswith("derived/") and not await ensure_derivative(key):
+            # Not rendered yet; show the original without letting the redirect be cached
+            return RedirectResponse(storage.public_url(derivative_original(key)), headers={"Cache-Control": "no-store"})
+        return await run_in_threadpool(storage.serve, key)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/profile/avatar")
 def upload_profile_avatar(
     file: UploadFile = FastAPIFile(...),
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    user = db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    # Save file
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        # Save file
-        ext = os.path.splitext(file.filename)[1]
-        filename = f"{user.id}_avatar{ext}"
-        file_path = os.path.join(AVATAR_DIR, filename)
-        with open(file_path, "wb") as f:
-            f.write(file.file.read())
-        # Update user avatar_url
-        user.avatar_url = f"/avatars/{filename}"
-        db.commit()
-        return {"avatar_url": user.avatar_url}
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        avatar_url = store_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    # Update user avatar_url
+    user.avatar_url = avatar_url
+    db.commit()
+    invalidate_identity(user.username)
+    response_cache.invalidate(f"user:{user.id}", "portfolio", "suggested")
+    return {"avatar_url": user.avatar_url}
 
 @app.post("/upload-artwork-image")
-async def upload_artwork_image(
+def upload_artwork_image(
     file: UploadFile = FastAPIFile(...),
-    token: str = Depends(oauth2_scheme)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     import traceback
     try:
-        contents = await file.read()
-        # Sanitize filename to remove invalid characters
-        safe_filename = re.sub(r'[^\w\-_\.]', '_', file.filename)
-        if not safe_filename or safe_filename.startswith('.'):
-            safe_filename = f"image_{int(time.time())}.jpg"
-        filename = f"{int(time.time())}_{safe_filename}"
-        print(f"Uploading file: {filename} to Supabase bucket: {SUPABASE_BUCKET}")
-        res = supabase.storage.from_(SUPABASE_BUCKET).upload(filename, contents, {"content-type": file.content_type, "x-upsert": "true"})
-        print("Supabase upload response:", res)
-        if hasattr(res, "error") and res.error is not None:
-            print("Upload error:", res.error)
-            raise HTTPException(status_code=500, detail=f"Upload failed: {res.error}")
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{filename}"
+        public_url = upload_image(file)
         print("[IMPORTANT] Returning public URL for uploaded image:", public_url)
         # NEXT STEPS:
         # 1. Copy the above URL and open it in your browser. If you see the image, the upload and permissions are correct.
         # 2. If you get 404 or 403, check your Supabase dashboard: Storage > artwork bucket > Settings. Make sure the bucket is public.
         # 3. In your React frontend, use this URL directly as the <img src> for the artwork image.
         return {"url": public_url}
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print("[ERROR] Exception in /upload-artwork-image:")
         traceback.print_exc()
@@ -985,37 +844,117 @@ async def upload_artwork_image(
 
 # Upload endpoint for post images
 @app.post("/upload-post-image")
-async def upload_post_image(
+def upload_post_image(
     file: UploadFile = FastAPIFile(...),
-    token: str = Depends(oauth2_scheme)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     import traceback
     try:
-        # Verify token
-        username = verify_token(token)
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        contents = await file.read()
-        # Sanitize filename to remove invalid characters
-        safe_filename = re.sub(r'[^\w\-_\.]', '_', file.filename)
-        if not safe_filename or safe_filename.startswith('.'):
-            safe_filename = f"image_{int(time.time())}.jpg"
-        filename = f"post_{int(time.time())}_{safe_filename}"
-        print(f"Uploading post image: {filename} to Supabase bucket: {SUPABASE_BUCKET}")
-        res = supabase.storage.from_(SUPABASE_BUCKET).upload(filename, contents, {"content-type": file.content_type, "x-upsert": "true"})
-        print("Supabase upload response:", res)
-        if hasattr(res, "error") and res.error is not None:
-            print("Upload error:", res.error)
-            raise HTTPException(status_code=500, detail=f"Upload failed: {res.error}")
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{filename}"
+        public_url = upload_image(file)
         print("[IMPORTANT] Returning public URL for uploaded post image:", public_url)
         return {"url": public_url}
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print("[ERROR] Exception in /upload-post-image:")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _resumable_upload_error(e: ValueError):
+    if isinstance(e, UploadNotFoundError):
+        return HTTPException(status_code=404, detail=str(e))
+    if isinstance(e, UploadConflictError):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, UploadTooLargeError):
+        return HTTPException(status_code=413, detail=str(e))
+    return HTTPException(status_code=400, detail=str(e))
+
+# Resumable uploads for large artwork: start, append chunks with PATCH, then complete
+@app.post("/uploads")
+def start_resumable_upload(
+    filename: str = Form(...),
+    size: int = Form(...),
+    content_type: str = Form(None),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Start a resumable upload; returns its id and the largest chunk a PATCH may carry"""
+    try:
+        return create_upload(current_user.id, filename, size, content_type)
+    except ValueError as e:
+        raise _resumable_upload_error(e)
+
+@app.get("/uploads/{upload_id}")
+def get_resumable_upload(upload_id: str, current_user: CurrentUser = Depends(get_current_user)):
+    """Offset to resume a resumable upload from"""
+    try:
+        return get_upload(upload_id, current_user.id)
+    except ValueError as e:
+        raise _resumable_upload_error(e)
+
+@app.patch("/uploads/{upload_id}")
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Append the request body to an upload at Upload-Offset
+
+    The body is written to disk as it arrives. If the connection drops,
+    the bytes received so far are kept; GET the upload for the new offset
+    and send the rest from there.
+    """
+    try:
+        writer = await run_in_threadpool(ChunkWriter, upload_id, current_user.id, upload_offset)
+    except ValueError as e:
+        raise _resumable_upload_error(e)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(writer.write, chunk)
+    except ValueError as e:
+        raise _resumable_upload_error(e)
+    finally:
+        upload = await run_in_threadpool(writer.close)
+    return upload
+
+@app.post("/uploads/{upload_id}/complete")
+def complete_resumable_upload(upload_id: str, current_user: CurrentUser = Depends(get_current_user)):
+    """Store a fully received upload like /upload-artwork-image and return its URL"""
+    try:
+        return {"url": complete_upload(upload_id, current_user.id)}
+    except ValueError as e:
+        raise _resumable_upload_error(e)
+
+@app.delete("/uploads/{upload_id}")
+def abort_resumable_upload(upload_id: str, current_user: CurrentUser = Depends(get_current_user)):
+    try:
+        delete_upload(upload_id, current_user.id)
+    except ValueError as e:
+        raise _resumable_upload_error(e)
+    return {"message": "Upload aborted"}
+
+@app.get("/cache/stats", dependencies=[Depends(require_ops_access)])
+def get_cache_stats():
+    """Get response cache hit/miss counters"""
+    return response_cache.stats()
+
+@app.get("/db/pool-stats", dependencies=[Depends(require_ops_access)])
+def get_pool_stats():
+    """Get connection pool usage: checked out connections, waits and overflow"""
+    return pool_stats()
+
+@app.get("/db/query-stats", dependencies=[Depends(require_ops_access)])
+def get_query_stats():
+    """Get per-route SQL statement counts and database time"""
+    return query_stats.stats()
+
+@app.get("/metrics", dependencies=[Depends(require_ops_access)])
+def get_metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/cors-test")
 def cors_test():
     return {"message": "CORS is working!"}
@@ -1050,22 +989,13 @@ def get_post_comments(post_id: int, db: Session = Depends(get_db)):
 def create_comment(
     post_id: int,
     comment: CommentCreate,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new comment on a post"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get user
-    user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     # Create comment with notification using the helper function
     try:
-        new_comment = create_comment_with_notification(db, post_id, user.id, comment.content)
+        new_comment = create_comment_with_notification(db, post_id, current_user.id, comment.content)
         return {"success": True, "comment_id": new_comment.id}
     except ValueError as e:
         if "Post not found" in str(e):
@@ -1138,25 +1068,12 @@ def get_skill_tags():
 @app.post("/users/{user_id}/follow")
 def follow_user(
     user_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Follow a user"""
     print(f"[FOLLOW DEBUG] Attempting to follow user_id: {user_id}")
-    
-    username = verify_token(token)
-    if not username:
-        print(f"[FOLLOW DEBUG] Invalid token")
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    print(f"[FOLLOW DEBUG] Current user: {username}")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        print(f"[FOLLOW DEBUG] Current user not found in database")
-        raise HTTPException(status_code=401, detail="User not found")
-    
+    print(f"[FOLLOW DEBUG] Current user: {current_user.username}")
     print(f"[FOLLOW DEBUG] Current user ID: {current_user.id}")
     
     # Check if target user exists
@@ -1192,46 +1109,26 @@ def follow_user(
         following_id=user_id
     )
     db.add(new_follow)
+    add_author_to_timeline(db, current_user.id, user_id)
     db.commit()
+    response_cache.invalidate("suggested", f"user:{current_user.id}", f"user:{user_id}")
     
     print(f"[FOLLOW DEBUG] Follow relationship created successfully")
     
-    # Create notification for the followed user
-    notification_service = NotificationService(db)
-    try:
-        notification_service.create_follow_notification(
-            follower_id=current_user.id,
-            following_id=user_id
-        )
-        print(f"[FOLLOW DEBUG] Follow notification created")
-    except Exception as e:
-        # Log the error but don't fail the follow operation
-        print(f"[FOLLOW DEBUG] Failed to create follow notification: {e}")
+    # Notify the followed user; written in the background
+    notify_follow(current_user.id, user_id)
     
     return {"success": True, "message": f"Now following {target_user.username}"}
 
 @app.delete("/users/{user_id}/follow")
 def unfollow_user(
     user_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Unfollow a user"""
     print(f"[UNFOLLOW DEBUG] Attempting to unfollow user_id: {user_id}")
-    
-    username = verify_token(token)
-    if not username:
-        print(f"[UNFOLLOW DEBUG] Invalid token")
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    print(f"[UNFOLLOW DEBUG] Current user: {username}")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        print(f"[UNFOLLOW DEBUG] Current user not found in database")
-        raise HTTPException(status_code=401, detail="User not found")
-    
+    print(f"[UNFOLLOW DEBUG] Current user: {current_user.username}")
     print(f"[UNFOLLOW DEBUG] Current user ID: {current_user.id}")
     
     # Check if target user exists (for better debugging)
@@ -1263,12 +1160,14 @@ def unfollow_user(
     
     print(f"[UNFOLLOW DEBUG] Deleting follow relationship")
     db.delete(follow_record)
+    remove_author_from_timeline(db, current_user.id, user_id)
     db.commit()
+    response_cache.invalidate("suggested", f"user:{current_user.id}", f"user:{user_id}")
     
     print(f"[UNFOLLOW DEBUG] Unfollow successful")
     return {"success": True, "message": "Unfollowed user"}
 
-@app.get("/users/{user_id}/followers")
+@app.get("/users/{user_id}/followers", dependencies=[Depends(use_read_replica)])
 def get_user_followers(user_id: int, db: Session = Depends(get_db)):
     """Get followers of a user"""
     followers = db.execute(
@@ -1288,7 +1187,7 @@ def get_user_followers(user_id: int, db: Session = Depends(get_db)):
     
     return {"followers": follower_list}
 
-@app.get("/users/{user_id}/following")
+@app.get("/users/{user_id}/following", dependencies=[Depends(use_read_replica)])
 def get_user_following(user_id: int, db: Session = Depends(get_db)):
     """Get users that a user is following"""
     following = db.execute(
@@ -1308,42 +1207,19 @@ def get_user_following(user_id: int, db: Session = Depends(get_db)):
     
     return {"following": following_list}
 
-@app.get("/users/{user_id}/follow_stats")
+@app.get("/users/{user_id}/follow_stats", dependencies=[Depends(use_read_replica)])
 def get_user_follow_stats(user_id: int, db: Session = Depends(get_db)):
     """Get follow statistics for a user"""
-    # Count followers
-    followers_count = db.execute(
-        select(func.count(Follow.follower_id))
-        .where(Follow.following_id == user_id)
-    ).scalar()
-    
-    # Count following
-    following_count = db.execute(
-        select(func.count(Follow.following_id))
-        .where(Follow.follower_id == user_id)
-    ).scalar()
-    
-    return {
-        "followers_count": followers_count or 0,
-        "following_count": following_count or 0
-    }
+    follow_stats, _ = follow_section(db, user_id)
+    return follow_stats
 
 @app.get("/users/{user_id}/is_following")
 def check_is_following(
     user_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Check if current user is following the specified user"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=404, detail="Current user not found")
-    
     # Check if following
     follow_record = db.execute(
         select(Follow).where(
@@ -1357,202 +1233,68 @@ def check_is_following(
 
 # =================== MESSAGING ENDPOINTS ===================
 
-@app.post("/send-message", response_model=MessageSchema)
+@app.post("/send-message")
 def send_message(
     message_data: MessageCreate,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Send a message to another user"""
-    # Get current user from token
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Check if receiver exists
-    receiver = db.execute(select(User).where(User.id == message_data.receiver_id)).scalar_one_or_none()
-    if not receiver:
-        raise HTTPException(status_code=404, detail="Receiver not found")
-    
-    # Can't send message to yourself
-    if current_user.id == message_data.receiver_id:
-        raise HTTPException(status_code=400, detail="Cannot send message to yourself")
-    
-    # Create new message
-    new_message = Message(
-        content=message_data.content,
-        sender_id=current_user.id,
-        receiver_id=message_data.receiver_id
-    )
-    
-    db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
-    
-    # Return message with user details
-    message_with_users = db.execute(
-        select(Message).where(Message.id == new_message.id)
-    ).scalar_one()
-    
-    return message_with_users
+    """Send a message to another user
+
+    The message is also pushed to both users' /ws/messages connections.
+    """
+    try:
+        return create_message(db, current_user.id, message_data.receiver_id, message_data.content)
+    except ValueError as e:
+        status_code = 404 if str(e) == "Receiver not found" else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
 
 
 @app.get("/conversations")
 def get_conversations(
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get list of users the current user has conversations with"""
-    # Get current user from token
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get all users who have exchanged messages with current user
-    # Using raw SQL for complex query
-    conversations_query = """
-    SELECT DISTINCT 
-        u.id, u.username, u.avatar_url,
-        m.content as last_message,
-        m.created_at as last_message_time,
-        m.sender_id as last_sender_id,
-        COUNT(CASE WHEN m2.is_read = false AND m2.receiver_id = :current_user_id THEN 1 END) as unread_count
-    FROM users u
-    JOIN messages m ON (m.sender_id = u.id OR m.receiver_id = u.id)
-    LEFT JOIN messages m2 ON (
-        (m2.sender_id = u.id AND m2.receiver_id = :current_user_id) OR 
-        (m2.sender_id = :current_user_id AND m2.receiver_id = u.id)
-    )
-    WHERE (m.sender_id = :current_user_id OR m.receiver_id = :current_user_id)
-    AND u.id != :current_user_id
-    AND m.id = (
-        SELECT MAX(m3.id) 
-        FROM messages m3 
-        WHERE (m3.sender_id = u.id AND m3.receiver_id = :current_user_id) 
-        OR (m3.sender_id = :current_user_id AND m3.receiver_id = u.id)
-    )
-    GROUP BY u.id, u.username, u.avatar_url, m.content, m.created_at, m.sender_id
-    ORDER BY m.created_at DESC
-    """
-    
-    result = db.execute(
-        text(conversations_query),
-        {"current_user_id": current_user.id}
-    )
-    
-    conversations = []
-    for row in result:
-        conversations.append({
-            "user": {
-                "id": row.id,
-                "username": row.username,
-                "avatar_url": row.avatar_url
-            },
-            "last_message": row.last_message,
-            "last_message_time": row.last_message_time,
-            "last_sender_id": row.last_sender_id,
-            "unread_count": row.unread_count or 0
-        })
-    
-    return conversations
+    return get_conversation_list(db, current_user.id)
 
 
 @app.get("/messages/{user_id}")
 def get_messages_with_user(
     user_id: int,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = None,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get messages between current user and specified user"""
-    # Get current user from token
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Check if other user exists
-    other_user = db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
-    if not other_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get messages between the two users
-    messages = db.execute(
-        select(Message)
-        .where(
-            ((Message.sender_id == current_user.id) & (Message.receiver_id == user_id)) |
-            ((Message.sender_id == user_id) & (Message.receiver_id == current_user.id))
-        )
-        .order_by(Message.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-    ).scalars().all()
-    
-    # Mark received messages as read
-    db.execute(
-        text("""
-        UPDATE messages 
-        SET is_read = true 
-        WHERE sender_id = :sender_id 
-        AND receiver_id = :receiver_id 
-        AND is_read = false
-        """),
-        {"sender_id": user_id, "receiver_id": current_user.id}
-    )
-    db.commit()
-    
-    # Reverse to show oldest first
-    messages = list(reversed(messages))
-    
-    return {
-        "messages": messages,
-        "other_user": {
-            "id": other_user.id,
-            "username": other_user.username,
-            "avatar_url": other_user.avatar_url
-        }
-    }
+    """Get messages between current user and specified user
+
+    Pages go backwards in time; pass next_cursor as cursor to load
+    older messages.
+    """
+    try:
+        return get_message_page(db, current_user.id, user_id, limit=limit, offset=offset, cursor=cursor)
+    except ValueError as e:
+        status_code = 404 if str(e) == "User not found" else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
 
 
 @app.put("/messages/{message_id}/read")
 def mark_message_as_read(
     message_id: int,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Mark a specific message as read"""
-    # Get current user from token
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get message
-    message = db.execute(select(Message).where(Message.id == message_id)).scalar_one_or_none()
-    if not message:
-        raise HTTPException(status_code=404, detail="Message not found")
-    
-    # Only receiver can mark message as read
-    if message.receiver_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Can only mark received messages as read")
-    
-    message.is_read = True
-    db.commit()
+    if mark_message_read(db, current_user.id, message_id) is None:
+        # Nothing changed: already read, missing, or someone else's message
+        receiver_id = db.execute(select(Message.receiver_id).where(Message.id == message_id)).scalar_one_or_none()
+        if receiver_id is None:
+            raise HTTPException(status_code=404, detail="Message not found")
+        # Only receiver can mark message as read
+        if receiver_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Can only mark received messages as read")
     
     return {"success": True, "message": "Message marked as read"}
 
@@ -1560,37 +1302,88 @@ def mark_message_as_read(
 @app.get("/unread-messages-count")
 def get_unread_messages_count(
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get total count of unread messages for current user"""
-    # Get current user from token
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Count unread messages
-    unread_count = db.execute(
-        select(func.count(Message.id))
-        .where(Message.receiver_id == current_user.id)
-        .where(Message.is_read == False)
-    ).scalar()
+    # Maintained counter, see user_counters.py
+    unread_count = get_unread_messages(db, current_user.id)
     
     return {"unread_count": unread_count}
 
 
+def _send_message_from_socket(sender_id: int, receiver_id: int, content: str):
+    with SessionLocal() as db:
+        create_message(db, sender_id, receiver_id, content)
+
+def _mark_read_from_socket(reader_id: int, other_user_id: int):
+    with SessionLocal() as db:
+        mark_conversation_read(db, reader_id, other_user_id)
+
+@app.websocket("/ws/messages")
+async def messages_socket(websocket: WebSocket, token: str = None):
+    """
+    Real-time messaging channel
+
+    Server -> client events:
+        {"type": "message", "message": {...}}
+        {"type": "delivered", "message_id", "receiver_id"}
+        {"type": "read", "reader_id", "sender_id", "message_ids"}
+        {"type": "error", "detail"}
+
+    Client -> server commands:
+        {"type": "send", "receiver_id", "content"}
+        {"type": "read", "user_id"}   marks the conversation with user_id read
+
+    An idle connection holds only a queue; no database session is kept
+    open between commands.
+    """
+    current_user = await run_in_threadpool(identity_from_token, token) if token else None
+    if not current_user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    channel = messages_channel(current_user.id)
+    queue = hub.subscribe(channel)
+
+    async def forward_events():
+        while True:
+            event = await queue.get()
+            await websocket.send_text(json.dumps(event, default=str))
+            if event["type"] == "message" and event["message"]["receiver_id"] == current_user.id:
+                publish_delivery_receipt(event["message"])
+
+    forwarder = asyncio.create_task(forward_events())
+    try:
+        while True:
+            try:
+                command = json.loads(await websocket.receive_text())
+                if command.get("type") == "send":
+                    await run_in_threadpool(
+                        _send_message_from_socket,
+                        current_user.id, int(command["receiver_id"]), str(command["content"])
+                    )
+                elif command.get("type") == "read":
+                    await run_in_threadpool(_mark_read_from_socket, current_user.id, int(command["user_id"]))
+                else:
+                    raise ValueError("Unknown command")
+            except (ValueError, KeyError, TypeError) as e:
+                await websocket.send_text(json.dumps({"type": "error", "detail": str(e)}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        forwarder.cancel()
+        hub.unsubscribe(channel, queue)
+
+
 # ei part extra
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from database import SessionLocal
 from models import PortfolioItem, User
 
-@app.get("/portfolio/{artwork_id}")
-def get_artwork_by_id(artwork_id: int):
-    db = SessionLocal()
+@app.get("/portfolio/{artwork_id}", dependencies=[Depends(use_read_replica)])
+def get_artwork_by_id(artwork_id: int, db: Session = Depends(get_db)):
     artwork = db.query(PortfolioItem).filter(PortfolioItem.id == artwork_id).first()
     if not artwork:
         raise HTTPException(status_code=404, detail="Artwork not found")
@@ -1603,6 +1396,7 @@ def get_artwork_by_id(artwork_id: int):
             "title": artwork.title,
             "description": artwork.description,
             "image_url": artwork.image_url,
+            "image_srcset": image_srcset(artwork.image_url),
             "created_at": artwork.created_at,
             "user": {
                 "id": user.id,
@@ -1617,74 +1411,107 @@ def get_artwork_by_id(artwork_id: int):
 # Notification endpoints
 @app.get("/notifications", response_model=List[NotificationSchema])
 def get_notifications(
-    limit: int = 50,
-    offset: int = 0,
-    token: str = Depends(oauth2_scheme),
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = None,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get notifications for the current user"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
+    """Get notifications for the current user
+
+    The body stays a plain list, so the cursor for the next page is
+    returned in the X-Next-Cursor header.
+    """
     # Get notifications using the service
     notification_service = NotificationService(db)
-    notifications = notification_service.get_user_notifications(
-        user_id=current_user.id,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        notifications, next_cursor = notification_service.get_user_notifications(
+            user_id=current_user.id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return notifications
 
 @app.get("/notifications/with-details")
 def get_notifications_with_details(
-    limit: int = 50,
-    offset: int = 0,
-    token: str = Depends(oauth2_scheme),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: str = None,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get notifications with user details for the current user"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     # Get notifications with details using the service
     notification_service = NotificationService(db)
-    notifications = notification_service.get_user_notifications_with_details(
-        user_id=current_user.id,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        notifications, next_cursor = notification_service.get_user_notifications_with_details(
+            user_id=current_user.id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"notifications": notifications}
+    return {"notifications": notifications, "next_cursor": next_cursor}
+
+# Seconds between SSE keepalive comments, keeps proxies from closing idle streams
+SSE_KEEPALIVE_SECONDS = 15
+
+def _unread_notification_count(user_id: int):
+    with SessionLocal() as db:
+        return NotificationService(db).get_unread_count(user_id)
+
+@app.get("/notifications/stream")
+async def stream_notifications(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user_from_query)
+):
+    """
+    Server-sent events stream of new notifications and unread count changes
+
+    Replaces polling /notifications/unread-count. The stream starts with
+    an unread_count event, then forwards every event published to the
+    user's channel.
+    """
+    channel = user_channel(current_user.id)
+    queue = hub.subscribe(channel)
+    unread_count = await run_in_threadpool(_unread_notification_count, current_user.id)
+
+    async def event_stream():
+        try:
+            yield f"event: unread_count\ndata: {json.dumps({'type': 'unread_count', 'unread_count': unread_count})}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            hub.unsubscribe(channel, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/notifications/{notification_id}/mark-read")
 def mark_notification_read(
     notification_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Mark a notification as read"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     # Mark notification as read
     notification_service = NotificationService(db)
     success = notification_service.mark_notification_as_read(
@@ -1699,19 +1526,10 @@ def mark_notification_read(
 
 @app.post("/notifications/mark-all-read")
 def mark_all_notifications_read(
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Mark all notifications as read for the current user"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     # Mark all notifications as read
     notification_service = NotificationService(db)
     count = notification_service.mark_all_notifications_as_read(current_user.id)
@@ -1720,19 +1538,10 @@ def mark_all_notifications_read(
 
 @app.get("/notifications/unread-count")
 def get_unread_notification_count(
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get count of unread notifications for the current user"""
-    username = verify_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    # Get current user
-    current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-    if not current_user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
     # Get unread count
     notification_service = NotificationService(db)
     unread_count = notification_service.get_unread_count(current_user.id)
@@ -1744,23 +1553,12 @@ def get_unread_notification_count(
 @app.post("/comments")
 def create_comment_endpoint(
     comment: CommentCreate,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Create a new comment and automatically trigger notifications
     """
-    # Get current user from token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     # Verify the post exists
     post = db.query(Post).filter(Post.id == comment.post_id).first()
     if not post:
@@ -1820,21 +1618,10 @@ def get_post_comments_endpoint(
 def update_comment(
     comment_id: int,
     comment_update: CommentUpdate,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update a comment (only by the comment author)"""
-    # Get current user from token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     # Get the comment
     comment = db.query(Comment).filter(Comment.id == comment_id).first()
     if not comment:
@@ -1866,21 +1653,10 @@ def update_comment(
 @app.delete("/comments/{comment_id}")
 def delete_comment(
     comment_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a comment (only by the comment author)"""
-    # Get current user from token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     # Get the comment
     comment = db.query(Comment).filter(Comment.id == comment_id).first()
     if not comment:
@@ -1890,8 +1666,9 @@ def delete_comment(
     if comment.author_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only delete your own comments")
     
-    # Delete the comment
+    # Delete the comment and keep the post's counter in step
     db.delete(comment)
+    adjust_comment_count(db, comment.post_id, -1)
     db.commit()
     
     return {"message": "Comment deleted successfully"}
@@ -1899,23 +1676,12 @@ def delete_comment(
 @app.post("/notifications/{notification_id}/read")
 def mark_notification_read_endpoint(
     notification_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Mark a specific notification as read
     """
-    # Get current user from token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     notification_service = NotificationService(db)
     success = notification_service.mark_notification_as_read(notification_id, current_user.id)
     
@@ -1929,23 +1695,12 @@ def mark_notification_read_endpoint(
 
 @app.post("/notifications/read-all")
 def mark_all_notifications_read_endpoint(
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Mark all notifications as read for the current user
     """
-    # Get current user from token
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     notification_service = NotificationService(db)
     count = notification_service.mark_all_notifications_as_read(current_user.id)
     
@@ -1954,19 +1709,8 @@ def mark_all_notifications_read_endpoint(
 
 # Review endpoints
 @app.post("/users/{user_id}/reviews")
-def create_review(user_id: int, review_data: ReviewCreate, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+def create_review(user_id: int, review_data: ReviewCreate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """Create a new review for a user"""
-    # Get current user
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        current_user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
-        
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     # Check if user is trying to review themselves
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot review yourself")
@@ -1991,10 +1735,11 @@ def create_review(user_id: int, review_data: ReviewCreate, db: Session = Depends
     db.add(review)
     db.commit()
     db.refresh(review)
+    response_cache.invalidate(f"reviews:{user_id}")
     
     return {"message": "Review created successfully", "review_id": review.id}
 
-@app.get("/users/{user_id}/reviews")
+@app.get("/users/{user_id}/reviews", dependencies=[Depends(use_read_replica)])
 def get_user_reviews(user_id: int, db: Session = Depends(get_db)):
     """Get all reviews for a user"""
     # Check if user exists
@@ -2002,28 +1747,10 @@ def get_user_reviews(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get reviews with reviewer information
-    reviews = db.execute(
-        select(Review, User).join(User, Review.reviewer_id == User.id).where(Review.artist_id == user_id).order_by(Review.created_at.desc())
-    ).all()
-    
-    review_list = []
-    for review, reviewer in reviews:
-        review_list.append({
-            "id": review.id,
-            "rating": review.rating,
-            "comment": review.comment,
-            "created_at": review.created_at,
-            "reviewer": {
-                "id": reviewer.id,
-                "username": reviewer.username,
-                "avatar_url": reviewer.avatar_url
-            }
-        })
-    
-    return {"reviews": review_list}
+    return {"reviews": reviews_section(db, user_id)}
 
-@app.get("/users/{user_id}/reviews/stats")
+@app.get("/users/{user_id}/reviews/stats", dependencies=[Depends(use_read_replica)])
+@cached("review_stats", tags=lambda user_id, **_: [f"reviews:{user_id}"])
 def get_user_review_stats(user_id: int, db: Session = Depends(get_db)):
     """Get review statistics for a user"""
     # Check if user exists
@@ -2031,28 +1758,7 @@ def get_user_review_stats(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get review statistics
-    reviews = db.execute(select(Review).where(Review.artist_id == user_id)).scalars().all()
-    
-    if not reviews:
-        return {
-            "total_reviews": 0,
-            "average_rating": 0,
-            "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        }
-    
-    total_reviews = len(reviews)
-    average_rating = sum(review.rating for review in reviews) / total_reviews
-    
-    rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    for review in reviews:
-        rating_distribution[review.rating] += 1
-    
-    return {
-        "total_reviews": total_reviews,
-        "average_rating": round(average_rating, 1),
-        "rating_distribution": rating_distribution
-    }
+    return review_stats_section(db, user_id)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,290 @@
+"""
+Direct message helper functions
+
+These functions create messages and mark conversations as read, and
+push the resulting message, delivery and read-receipt events to the
+participants' messaging channels so connected clients do not have to
+poll.
+
+Each pair of users also has a row in the conversations summary table
+holding the latest message and both sides' unread counts. It is updated
+in the same transaction as the messages it summarizes, so listing a
+user's conversations never has to scan message history.
+"""
+
+from events import messages_channel, publish
+from models import Conversation, Message, User
+from pagination import paginate, page_results
+from sqlalchemy import case, func, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from user_counters import adjust_unread_messages
+
+# Characters of the latest message kept for the conversation list
+CONVERSATION_PREVIEW_LENGTH = 200
+
+def _user_summary(user: User):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "avatar_url": user.avatar_url
+    }
+
+def message_to_dict(message: Message, sender: User, receiver: User):
+    """Serialize a message for pushed events and API responses"""
+    return {
+        "id": message.id,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "is_read": message.is_read,
+        "sender_id": message.sender_id,
+        "receiver_id": message.receiver_id,
+        "sender": _user_summary(sender),
+        "receiver": _user_summary(receiver)
+    }
+
+def _user_pair(user_a: int, user_b: int):
+    return (user_a, user_b) if user_a < user_b else (user_b, user_a)
+
+def _record_in_conversation(db: Session, message: Message):
+    """Upsert the pair's summary row for a new message. Does not commit."""
+    low_id, high_id = _user_pair(message.sender_id, message.receiver_id)
+    receiver_is_low = message.receiver_id == low_id
+    stmt = insert(Conversation).values(
+        user_low_id=low_id,
+        user_high_id=high_id,
+        last_message_id=message.id,
+        last_sender_id=message.sender_id,
+        last_message_preview=message.content[:CONVERSATION_PREVIEW_LENGTH],
+        last_message_at=message.created_at,
+        user_low_unread=1 if receiver_is_low else 0,
+        user_high_unread=0 if receiver_is_low else 1
+    )
+    # Concurrent sends may commit out of order; keep the newest message
+    is_newer = stmt.excluded.last_message_id > Conversation.last_message_id
+
+    def latest(column):
+        return case((is_newer, stmt.excluded[column]), else_=getattr(Conversation, column))
+
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Conversation.user_low_id, Conversation.user_high_id],
+        set_={
+            "last_message_id": latest("last_message_id"),
+            "last_sender_id": latest("last_sender_id"),
+            "last_message_preview": latest("last_message_preview"),
+            "last_message_at": latest("last_message_at"),
+            "user_low_unread": Conversation.user_low_unread + stmt.excluded.user_low_unread,
+            "user_high_unread": Conversation.user_high_unread + stmt.excluded.user_high_unread
+        }
+    ))
+
+def clear_conversation_unread(db: Session, reader_id: int, other_user_id: int, count: int = None):
+    """
+    Lower reader_id's unread count in their conversation with other_user_id
+
+    Does not commit.
+
+    Args:
+        count: Number of messages that were read, or None to reset to zero
+    """
+    low_id, high_id = _user_pair(reader_id, other_user_id)
+    column = Conversation.user_low_unread if reader_id == low_id else Conversation.user_high_unread
+    db.execute(
+        update(Conversation)
+        .where(Conversation.user_low_id == low_id, Conversation.user_high_id == high_id)
+        .values({column: 0 if count is None else func.greatest(column - count, 0)})
+        .execution_options(synchronize_session=False)
+    )
+
+def get_conversation_list(db: Session, user_id: int):
+    """
+    List a user's conversations, most recent first
+
+    Returns:
+        list: Dicts with the other user, last message and the user's unread count
+    """
+    # One branch per side, each filtered and ordered by its own
+    # (user_x_id, last_message_at) index, so the planner can merge two
+    # index scans instead of scanning for an OR across both columns
+    def side(own_id, other_id, unread):
+        return (
+            select(
+                other_id.label("other_id"),
+                Conversation.last_message_preview,
+                Conversation.last_message_at,
+                Conversation.last_sender_id,
+                unread.label("unread_count")
+            )
+            .where(own_id == user_id)
+        )
+
+    sides = union_all(
+        side(Conversation.user_low_id, Conversation.user_high_id, Conversation.user_low_unread),
+        side(Conversation.user_high_id, Conversation.user_low_id, Conversation.user_high_unread)
+    ).subquery()
+    rows = db.execute(
+        select(sides, User)
+        .join(User, User.id == sides.c.other_id)
+        .order_by(sides.c.last_message_at.desc())
+    ).all()
+
+    return [
+        {
+            "user": _user_summary(row.User),
+            "last_message": row.last_message_preview,
+            "last_message_time": row.last_message_at,
+            "last_sender_id": row.last_sender_id,
+            "unread_count": row.unread_count
+        }
+        for row in rows
+    ]
+
+def create_message(db: Session, sender_id: int, receiver_id: int, content: str):
+    """
+    Create a message and push it to both participants
+
+    Args:
+        db: Database session
+        sender_id: ID of the sending user
+        receiver_id: ID of the receiving user
+        content: Message text
+
+    Returns:
+        dict: The created message, serialized like the pushed message
+        event, so callers can return it after the session is closed
+
+    Raises:
+        ValueError: If the receiver does not exist or is the sender
+    """
+    if sender_id == receiver_id:
+        raise ValueError("Cannot send message to yourself")
+
+    sender = db.get(User, sender_id)
+    receiver = db.get(User, receiver_id)
+    if not receiver:
+        raise ValueError("Receiver not found")
+    if not sender:
+        raise ValueError("Sender not found")
+
+    message = Message(
+        content=content,
+        sender_id=sender_id,
+        receiver_id=receiver_id
+    )
+    db.add(message)
+    db.flush()
+    _record_in_conversation(db, message)
+    adjust_unread_messages(db, receiver_id, 1)
+    db.commit()
+    db.refresh(message)
+
+    data = message_to_dict(message, sender, receiver)
+    event = {"type": "message", "message": data}
+    publish(messages_channel(receiver_id), event)
+    # Echo to the sender so their other tabs stay in sync
+    publish(messages_channel(sender_id), event)
+
+    return data
+
+def get_message_page(db: Session, reader_id: int, other_user_id: int, limit: int = 50, offset: int = 0, cursor: str = None):
+    """
+    Load one page of a conversation and mark it read for reader_id
+
+    Pages go backwards in time but each page is returned oldest first.
+
+    Returns:
+        dict: {"messages": [...], "other_user": {...}, "next_cursor": ...}
+
+    Raises:
+        ValueError: If the other user does not exist or the cursor is malformed
+    """
+    other_user = db.get(User, other_user_id)
+    if not other_user:
+        raise ValueError("User not found")
+
+    query = select(Message).where(
+        ((Message.sender_id == reader_id) & (Message.receiver_id == other_user_id)) |
+        ((Message.sender_id == other_user_id) & (Message.receiver_id == reader_id))
+    )
+    query = paginate(query, Message.created_at, Message.id, limit, cursor=cursor, skip=offset)
+    messages, next_cursor = page_results(
+        db.execute(query).scalars().all(), limit, lambda message: (message.created_at, message.id)
+    )
+
+    # Mark received messages as read and send a read receipt
+    mark_conversation_read(db, reader_id, other_user_id)
+
+    return {
+        "messages": list(reversed(messages)),
+        "other_user": _user_summary(other_user),
+        "next_cursor": next_cursor
+    }
+
+def mark_conversation_read(db: Session, reader_id: int, other_user_id: int):
+    """
+    Mark every unread message from other_user_id to reader_id as read
+
+    Sends a read receipt to the other user when anything changed.
+
+    Returns:
+        list: IDs of the messages that were marked as read
+    """
+    message_ids = db.execute(
+        update(Message)
+        .where(
+            Message.sender_id == other_user_id,
+            Message.receiver_id == reader_id,
+            Message.is_read == False
+        )
+        .values(is_read=True)
+        .returning(Message.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if message_ids:
+        clear_conversation_unread(db, reader_id, other_user_id)
+        adjust_unread_messages(db, reader_id, -len(message_ids))
+    db.commit()
+
+    if message_ids:
+        publish_read_receipt(reader_id, other_user_id, message_ids)
+    return message_ids
+
+def mark_message_read(db: Session, reader_id: int, message_id: int):
+    """
+    Mark one message to reader_id as read
+
+    The flag is flipped with a conditional UPDATE, so concurrent requests
+    for the same message adjust the unread counters only once.
+
+    Returns:
+        int: The sender's ID if the message was unread, otherwise None
+    """
+    sender_id = db.execute(
+        update(Message)
+        .where(Message.id == message_id, Message.receiver_id == reader_id, Message.is_read == False)
+        .values(is_read=True)
+        .returning(Message.sender_id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if sender_id is not None:
+        clear_conversation_unread(db, reader_id, sender_id, count=1)
+        adjust_unread_messages(db, reader_id, -1)
+    db.commit()
+
+    if sender_id is not None:
+        publish_read_receipt(reader_id, sender_id, [message_id])
+    return sender_id
+
+def publish_read_receipt(reader_id: int, sender_id: int, message_ids):
+    """Tell the sender (and the reader's other tabs) that messages were read"""
+    event = {"type": "read", "reader_id": reader_id, "sender_id": sender_id, "message_ids": list(message_ids)}
+    publish(messages_channel(sender_id), event)
+    publish(messages_channel(reader_id), event)
+
+def publish_delivery_receipt(message: dict):
+    """Tell the sender that a pushed message reached one of the receiver's connections"""
+    publish(messages_channel(message["sender_id"]), {
+        "type": "delivered",
+        "message_id": message["id"],
+        "receiver_id": message["receiver_id"]
+    })
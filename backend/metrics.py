@@ -0,0 +1,200 @@
+"""
+Prometheus metrics for the API workers
+
+RequestMetricsMiddleware records, per route template and method, how
+many requests finished with which status and a latency histogram, plus
+the number of requests in flight. Everything else is read from the
+collectors the app already keeps when /metrics is scraped: SQL
+statement counts and database time per route (query_metrics), response
+cache hits and misses, connection pool usage, the notification outbox
+backlog and open realtime subscriptions.
+
+Long-lived connections are left out of the request metrics: WebSocket
+sessions never pass through as HTTP requests, and a Server-Sent Events
+response stops counting once its headers are sent. Otherwise an open
+stream would hold the in-flight gauge up and land in the +Inf latency
+bucket when it closes.
+
+Collectors are plain counters behind a lock; rendering happens only on
+scrape. Each worker process reports its own numbers, so scrape every
+worker or aggregate them in Prometheus. /metrics requires OPS_TOKEN as
+a bearer token when it is set (see auth.require_ops_access).
+"""
+
+import bisect
+import os
+import threading
+import time
+
+from cache import response_cache
+from database import pool_stats
+from events import hub
+from notification_outbox import notification_outbox
+from query_metrics import query_stats, route_name
+
+METRICS_LATENCY_BUCKETS = [
+    float(bucket) for bucket in
+    os.getenv("METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10").split(",")
+]
+
+class RequestMetrics:
+    """Per-route request counts, latency histograms and in-flight requests"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.in_flight = 0
+        self._requests = {}  # (method, route, status) -> count
+        self._latency = {}  # (method, route) -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def detached(self):
+        """Stop counting a request that turned into a long-lived stream"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def finished(self, method: str, route: str, status: int, seconds: float):
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[bucket] += 1
+            histogram[-1] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return self.in_flight, dict(self._requests), {key: list(value) for key, value in self._latency.items()}
+
+request_metrics = RequestMetrics(METRICS_LATENCY_BUCKETS)
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request for request_metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    streaming = True
+                    request_metrics.detached()
+            await send(message)
+
+        request_metrics.started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not streaming:
+                _, route = route_name(scope).split(" ", 1)
+                request_metrics.finished(scope["method"], route, status, time.perf_counter() - started)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Exposition:
+    """Builds the Prometheus text format, one metric family at a time"""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, metric_type: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels)} {_number(value)}")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    out = _Exposition()
+    in_flight, requests, latency = request_metrics.snapshot()
+
+    out.family("http_requests_total", "counter", "HTTP requests by route, method and status code")
+    for (method, route, status), count in sorted(requests.items()):
+        out.sample("http_requests_total", count, method=method, route=route, status=status)
+
+    out.family("http_request_duration_seconds", "histogram", "HTTP request latency by route and method")
+    for (method, route), histogram in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(request_metrics.buckets + [float("inf")], histogram[:-1]):
+            cumulative += count
+            out.sample("http_request_duration_seconds_bucket", cumulative, method=method, route=route, le=_number(bound))
+        out.sample("http_request_duration_seconds_sum", histogram[-1], method=method, route=route)
+        out.sample("http_request_duration_seconds_count", cumulative, method=method, route=route)
+
+    out.family("http_requests_in_flight", "gauge", "HTTP requests currently being handled")
+    out.sample("http_requests_in_flight", in_flight)
+
+    routes = sorted(query_stats.routes().items())
+    out.family("db_queries_total", "counter", "SQL statements executed by route")
+    for key, totals in routes:
+        method, route = key.split(" ", 1)
+        out.sample("db_queries_total", totals["queries"], method=method, route=route)
+    out.family("db_query_duration_seconds_total", "counter", "Time spent waiting on SQL statements by route")
+    for key, totals in routes:
+        method, route = key.split(" ", 1)
+        out.sample("db_query_duration_seconds_total", totals["db_seconds"], method=method, route=route)
+    out.family("db_n_plus_one_requests_total", "counter", "Requests that repeated one statement more than QUERY_REPEAT_THRESHOLD times")
+    for key, totals in routes:
+        method, route = key.split(" ", 1)
+        out.sample("db_n_plus_one_requests_total", totals["n_plus_one_warnings"], method=method, route=route)
+
+    pools = sorted(pool_stats().items())
+    for key, metric, metric_type, help_text in (
+        ("checked_out", "db_pool_checked_out", "gauge", "Connections currently checked out of the pool"),
+        ("overflow", "db_pool_overflow", "gauge", "Connections open beyond pool_size"),
+        ("waits", "db_pool_waits_total", "counter", "Checkouts that had to wait for a connection"),
+        ("timeouts", "db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection"),
+    ):
+        out.family(metric, metric_type, help_text)
+        for pool_name, stats in pools:
+            out.sample(metric, stats[key], pool=pool_name)
+
+    cache = response_cache.stats()
+    out.family("cache_hits_total", "counter", "Response cache hits")
+    out.sample("cache_hits_total", cache["hits"])
+    out.family("cache_misses_total", "counter", "Response cache misses")
+    out.sample("cache_misses_total", cache["misses"])
+    out.family("cache_hit_ratio", "gauge", "Response cache hits divided by lookups since start")
+    out.sample("cache_hit_ratio", cache["hit_ratio"])
+    out.family("cache_entries", "gauge", "Entries in the response cache")
+    out.sample("cache_entries", cache["entries"])
+
+    out.family("notification_outbox_pending", "gauge", "Notification events queued but not yet written")
+    out.sample("notification_outbox_pending", notification_outbox.pending())
+    out.family("realtime_subscribers", "gauge", "Open notification and message stream subscriptions on this worker")
+    out.sample("realtime_subscribers", hub.subscriber_count())
+
+    return out.text()
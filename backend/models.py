@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Float, UniqueConstraint, CheckConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Enum, Float, UniqueConstraint, CheckConstraint, Index, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -33,6 +34,9 @@ class User(Base):
     bio = Column(Text)
     avatar_url = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set once the user has too many followers for fan-out-on-write;
+    # their posts are merged into timelines at read time instead
+    fanout_on_read = Column(Boolean, nullable=False, default=False, server_default="false")
     
     # Relationships
     portfolio_items = relationship("PortfolioItem", back_populates="artist")
@@ -104,6 +108,10 @@ class PortfolioItem(Base):
     # Relationships
     artist = relationship("User", back_populates="portfolio_items")
 
+    __table_args__ = (
+        Index("ix_portfolio_items_artist_created", "artist_id", "created_at"),
+    )
+
 class Post(Base):
     __tablename__ = "posts"
 
@@ -112,6 +120,9 @@ class Post(Base):
     image_url = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Denormalized engagement counters, maintained by post_counters
+    upvote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     author = relationship("User", back_populates="posts")
@@ -119,6 +130,11 @@ class Post(Base):
     post_tags = relationship("PostTag", back_populates="post")
     upvotes = relationship("Upvote", back_populates="post")
 
+    __table_args__ = (
+        Index("ix_posts_created_id", "created_at", "id"),
+        Index("ix_posts_author_created", "author_id", "created_at"),
+    )
+
 class Comment(Base):
     __tablename__ = "comments"
 
@@ -132,6 +148,10 @@ class Comment(Base):
     post = relationship("Post", back_populates="comments")
     author = relationship("User", back_populates="comments")
 
+    __table_args__ = (
+        Index("ix_comments_post_created", "post_id", "created_at"),
+    )
+
 class UserTag(Base):
     __tablename__ = "user_tags"
 
@@ -150,6 +170,10 @@ class PostTag(Base):
     # Relationships
     post = relationship("Post", back_populates="post_tags")
 
+    __table_args__ = (
+        Index("ix_post_tags_tag_post", "tag", "post_id"),
+    )
+
 class Upvote(Base):
     __tablename__ = "upvotes"
 
@@ -160,6 +184,10 @@ class Upvote(Base):
     user = relationship("User", back_populates="user_upvotes")
     post = relationship("Post", back_populates="upvotes")
 
+    __table_args__ = (
+        Index("ix_upvotes_post", "post_id"),
+    )
+
 class ArtRequest(Base):
     __tablename__ = "art_requests"
 
@@ -178,6 +206,12 @@ class ArtRequest(Base):
         back_populates="art_requests_sent",
     )
 
+    __table_args__ = (
+        Index("ix_art_requests_created_id", "created_at", "id"),
+        Index("ix_art_requests_status_created_id", "status", "created_at", "id"),
+        Index("ix_art_requests_requester_created_id", "requester_id", "created_at", "id"),
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
 
@@ -195,6 +229,7 @@ class Review(Base):
     # Table constraints
     __table_args__ = (
         CheckConstraint('rating >= 1 AND rating <= 5', name='rating_range_check'),
+        Index("ix_reviews_artist_created", "artist_id", "created_at"),
     )
 
 class Message(Base):
@@ -211,6 +246,40 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
 
+    __table_args__ = (
+        Index("ix_messages_pair_created_id", "sender_id", "receiver_id", "created_at", "id"),
+        # Only unread rows, for marking a conversation read
+        Index("ix_messages_unread", "receiver_id", "sender_id", postgresql_where=text("is_read = false")),
+    )
+
+class UserCounter(Base):
+    __tablename__ = "user_counters"
+
+    # Denormalized per-user unread totals, maintained by user_counters.py
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
+    unread_messages = Column(Integer, nullable=False, default=0, server_default="0")
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+
+    # One row per pair of users, stored with the lower user id first
+    user_low_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    user_high_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_message_id = Column(Integer, ForeignKey("messages.id"), nullable=False)
+    last_sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_message_preview = Column(String(200), nullable=False)
+    last_message_at = Column(DateTime, nullable=False)
+    # Messages each side has received but not read yet
+    user_low_unread = Column(Integer, nullable=False, default=0, server_default="0")
+    user_high_unread = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        CheckConstraint("user_low_id < user_high_id", name="check_conversation_user_order"),
+        Index("ix_conversations_low_last_message", "user_low_id", "last_message_at"),
+        Index("ix_conversations_high_last_message", "user_high_id", "last_message_at"),
+    )
+
 class Follow(Base):
     __tablename__ = "follows"
 
@@ -221,6 +290,11 @@ class Follow(Base):
     follower = relationship("User", foreign_keys=[follower_id], back_populates="following")
     following = relationship("User", foreign_keys=[following_id], back_populates="followers")
 
+    __table_args__ = (
+        # The primary key covers lookups by follower_id
+        Index("ix_follows_following_follower", "following_id", "follower_id"),
+    )
+
 class Notification(Base):
     __tablename__ = "notifications"
 
@@ -230,8 +304,44 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Most recent actor; coalesced rows also count every actor merged in
     actor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # What the notification is about, e.g. the post id for reactions and
+    # comments; null for follows, whose target is the recipient
+    target_id = Column(Integer)
+    actor_count = Column(Integer, nullable=False, default=1, server_default="1")
+    # A few recent actor ids, newest first
+    sample_actor_ids = Column(ARRAY(Integer), nullable=False, default=list, server_default="{}")
     
     # Relationships
     user = relationship("User", foreign_keys=[user_id])
     actor = relationship("User", foreign_keys=[actor_id])
+
+    __table_args__ = (
+        Index("ix_notifications_coalesce", "user_id", "type", "target_id"),
+        Index("ix_notifications_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_notifications_unread", "user_id", postgresql_where=text("is_read = false")),
+    )
+
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entries"
+
+    # Materialized "following" timeline, one row per (reader, post)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_timeline_entries_user_created", "user_id", "created_at", "post_id"),
+    )
+
+class StoredObject(Base):
+    __tablename__ = "stored_objects"
+
+    # Content-addressed uploads: one row per distinct file, keyed by its SHA-256
+    sha256 = Column(String(64), primary_key=True)
+    key = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
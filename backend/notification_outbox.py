@@ -0,0 +1,298 @@
+"""
+Notification outbox
+
+Request handlers enqueue lightweight notification events and return
+immediately. A background worker drains the queue in batches: it
+resolves actor usernames and post authors with one query each, writes
+every notification in the batch with a single multi-row INSERT and
+commits once, then pushes the new notifications to the recipients'
+event streams.
+
+Notifications are coalesced: events with the same recipient, type and
+target (the post for reactions and comments) update one row holding
+the actor count and a few sample actors, so a viral post produces
+"alice and 12 others reacted to your post." rather than 13 rows.
+
+A batch that fails to write (e.g. the database is briefly unreachable)
+is kept and retried with exponential backoff. If it still fails after
+NOTIFICATION_MAX_RETRIES attempts, its events are written one at a time
+so that only the events that cannot be written are dropped and logged.
+Events count as done for flush() only after this.
+
+The outbox lives in process memory, so events still queued when a
+worker is killed are lost. The shutdown hook flushes the queue on a
+normal stop.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from events import publish, user_channel
+from models import Notification, NotificationType, Post, User
+from notification_service import NotificationService
+from sqlalchemy import insert, select
+from user_counters import adjust_unread_notifications, get_unread_notifications_for
+
+OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "200"))
+# Seconds the worker waits for more events before writing a partial batch
+OUTBOX_FLUSH_INTERVAL = float(os.getenv("NOTIFICATION_FLUSH_INTERVAL", "0.2"))
+# Retries of a failed batch, waiting NOTIFICATION_RETRY_DELAY seconds
+# before the first and doubling the wait each time
+OUTBOX_MAX_RETRIES = int(os.getenv("NOTIFICATION_MAX_RETRIES", "5"))
+OUTBOX_RETRY_DELAY = float(os.getenv("NOTIFICATION_RETRY_DELAY", "0.5"))
+OUTBOX_MAX_RETRY_DELAY = 30
+# Seconds during which new actors are merged into an unread notification
+# with the same type and target; 0 writes one row per batch group
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv("NOTIFICATION_COALESCE_WINDOW", "86400"))
+# Actor ids kept on a coalesced notification
+NOTIFICATION_SAMPLE_ACTORS = 3
+
+NOTIFICATION_MESSAGES = {
+    NotificationType.follow: "{actor} started following you.",
+    NotificationType.post_reaction: "{actor} reacted to your post.",
+    NotificationType.comment: "{actor} commented on your post.",
+}
+
+@dataclass(frozen=True)
+class OutboxEvent:
+    """
+    A notification waiting to be written
+
+    Either recipient_id or post_id must be set; when only post_id is
+    given the post's author is notified.
+    """
+    type: NotificationType
+    actor_id: int
+    recipient_id: int = None
+    post_id: int = None
+    created_at: datetime = None
+
+class NotificationOutbox:
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, event: OutboxEvent):
+        """Queue a notification; never blocks on the database"""
+        if event.created_at is None:
+            event = OutboxEvent(event.type, event.actor_id, event.recipient_id, event.post_id, datetime.utcnow())
+        self.start()
+        self._queue.put(event)
+
+    def start(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+                self._worker.start()
+
+    def flush(self):
+        """Block until every queued event has been written"""
+        self._queue.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+
+            try:
+                self._write_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_with_retry(self, batch):
+        delay = OUTBOX_RETRY_DELAY
+        for attempt in range(OUTBOX_MAX_RETRIES + 1):
+            try:
+                pushed = write_notifications(batch)
+            except Exception as e:
+                print(f"[OUTBOX] Failed to write {len(batch)} notifications (attempt {attempt + 1}): {e}")
+            else:
+                publish_notifications(pushed)
+                return
+            if attempt < OUTBOX_MAX_RETRIES:
+                time.sleep(delay)
+                delay = min(delay * 2, OUTBOX_MAX_RETRY_DELAY)
+
+        # A batch that keeps failing usually holds one bad event; write the
+        # events separately so the rest of the batch is not lost with it
+        for event in batch:
+            try:
+                pushed = write_notifications([event])
+            except Exception as e:
+                print(f"[OUTBOX] Dropping notification {event}: {e}")
+                continue
+            publish_notifications(pushed)
+
+def _notification_message(notification_type: NotificationType, actor: str, actor_count: int):
+    """Render e.g. "alice and 12 others reacted to your post." """
+    if actor_count == 2:
+        actor = f"{actor} and 1 other"
+    elif actor_count > 2:
+        actor = f"{actor} and {actor_count - 1} others"
+    return NOTIFICATION_MESSAGES[notification_type].format(actor=actor)
+
+def _group_events(events, post_authors):
+    """
+    Group events by (recipient, type, target), keeping actors newest first
+
+    Self-notifications and events for posts that no longer exist are dropped.
+    """
+    groups = {}
+    for event in events:
+        recipient_id = event.recipient_id or post_authors.get(event.post_id)
+        if recipient_id is None or recipient_id == event.actor_id:
+            continue
+        key = (recipient_id, event.type, event.post_id)
+        groups.setdefault(key, []).insert(0, event)
+    return groups
+
+def _open_notifications(db, groups):
+    """Lock the unread notifications that new events in groups may merge into"""
+    cutoff = datetime.utcnow() - timedelta(seconds=NOTIFICATION_COALESCE_WINDOW)
+    candidates = db.execute(
+        select(Notification)
+        .where(
+            Notification.user_id.in_({key[0] for key in groups}),
+            Notification.type.in_({key[1] for key in groups}),
+            Notification.is_read == False,
+            Notification.created_at >= cutoff
+        )
+        .order_by(Notification.created_at)
+        .with_for_update()
+    ).scalars().all()
+    # Later rows win, so each key maps to its newest open notification
+    return {(n.user_id, n.type, n.target_id): n for n in candidates}
+
+def write_notifications(events):
+    """
+    Write a batch of outbox events in one transaction
+
+    Events with the same recipient, type and target are merged into a
+    single notification. When NOTIFICATION_COALESCE_WINDOW is set they
+    are also merged into a matching unread notification created within
+    that many seconds, which is updated in place and moved to the top.
+
+    Only the database work happens here, so a failed call can be retried
+    without writing anything twice; publish_notifications pushes the
+    result afterwards.
+
+    Returns:
+        list: (recipient id, notification details) for each created or
+        updated notification
+    """
+    with SessionLocal() as db:
+        actor_ids = {event.actor_id for event in events}
+        post_ids = {event.post_id for event in events if event.recipient_id is None}
+
+        usernames = dict(db.execute(
+            select(User.id, User.username).where(User.id.in_(actor_ids))
+        ).all())
+        post_authors = dict(db.execute(
+            select(Post.id, Post.author_id).where(Post.id.in_(post_ids))
+        ).all()) if post_ids else {}
+
+        events = [event for event in events if event.actor_id in usernames]
+        groups = _group_events(events, post_authors)
+        if not groups:
+            return []
+        existing = _open_notifications(db, groups) if NOTIFICATION_COALESCE_WINDOW > 0 else {}
+
+        rows = []
+        updated = []
+        for (recipient_id, notification_type, target_id), group in groups.items():
+            latest = group[0]
+            new_actor_ids = list(dict.fromkeys(event.actor_id for event in group))
+
+            notification = existing.get((recipient_id, notification_type, target_id))
+            if notification is not None:
+                # Actors already in the sample are repeats (e.g. re-upvotes)
+                repeat_ids = set(notification.sample_actor_ids)
+                actor_count = notification.actor_count + sum(1 for a in new_actor_ids if a not in repeat_ids)
+                notification.actor_id = latest.actor_id
+                notification.actor_count = actor_count
+                notification.sample_actor_ids = list(dict.fromkeys(
+                    new_actor_ids + notification.sample_actor_ids
+                ))[:NOTIFICATION_SAMPLE_ACTORS]
+                notification.message = _notification_message(
+                    notification_type, usernames[latest.actor_id], actor_count
+                )
+                notification.created_at = latest.created_at
+                updated.append(notification)
+                continue
+
+            rows.append({
+                "user_id": recipient_id,
+                "actor_id": latest.actor_id,
+                "target_id": target_id,
+                "actor_count": len(new_actor_ids),
+                "sample_actor_ids": new_actor_ids[:NOTIFICATION_SAMPLE_ACTORS],
+                "message": _notification_message(notification_type, usernames[latest.actor_id], len(new_actor_ids)),
+                "type": notification_type,
+                "created_at": latest.created_at,
+                "is_read": False
+            })
+
+        db.flush()
+        notifications = updated
+        if rows:
+            notifications = updated + db.scalars(insert(Notification).returning(Notification), rows).all()
+            # Merged rows were already unread; only new rows raise the counters
+            new_per_user = Counter(row["user_id"] for row in rows)
+            for user_id, count in new_per_user.items():
+                adjust_unread_notifications(db, user_id, count)
+        # Serialize before commit expires the returned objects
+        pushed = [
+            (n.user_id, NotificationService._notification_details(n, usernames[n.actor_id]))
+            for n in notifications
+        ]
+        db.commit()
+        return pushed
+
+def publish_notifications(pushed):
+    """
+    Push written notifications and the recipients' unread counts to their streams
+
+    Runs after the batch is committed; a failure here is only logged,
+    since the notifications are already stored and must not be rewritten.
+    """
+    if not pushed:
+        return
+    try:
+        with SessionLocal() as db:
+            unread_counts = get_unread_notifications_for(db, {user_id for user_id, _ in pushed})
+        for user_id, details in pushed:
+            publish(user_channel(user_id), {
+                "type": "notification",
+                "notification": details,
+                "unread_count": unread_counts.get(user_id, 0)
+            })
+    except Exception as e:
+        print(f"[OUTBOX] Failed to publish {len(pushed)} notifications: {e}")
+
+notification_outbox = NotificationOutbox(OUTBOX_BATCH_SIZE, OUTBOX_FLUSH_INTERVAL)
+
+def notify_follow(follower_id: int, following_id: int):
+    notification_outbox.enqueue(OutboxEvent(NotificationType.follow, follower_id, recipient_id=following_id))
+
+def notify_post_reaction(reactor_id: int, post_id: int):
+    notification_outbox.enqueue(OutboxEvent(NotificationType.post_reaction, reactor_id, post_id=post_id))
+
+def notify_comment(commenter_id: int, post_id: int):
+    notification_outbox.enqueue(OutboxEvent(NotificationType.comment, commenter_id, post_id=post_id))
@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination helpers
+
+List endpoints order rows by (created_at, id) descending. Instead of
+OFFSET, a client can pass back the opaque cursor from the previous page
+and the next page is read with a range condition on that pair, which
+the database can answer with an index range scan at any depth.
+
+Page sizes are limited to 1..MAX_PAGE_SIZE, so a client cannot turn a
+paginated endpoint back into an unbounded scan.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        tuple: (created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def paginate(query, created_at_col, id_col, limit: int, cursor: str = None, skip: int = 0):
+    """
+    Order a select newest-first and restrict it to one page
+
+    When a cursor is given the page starts after the cursor position,
+    otherwise the legacy skip offset is used. One extra row is fetched
+    so page_results can tell whether another page exists.
+
+    Args:
+        query: The select to paginate
+        created_at_col: Timestamp column used as the primary sort key
+        id_col: Primary key column used as the tie-breaker
+        limit: Page size
+        cursor: Cursor returned with the previous page, if any
+        skip: Offset used when no cursor is given
+
+    Returns:
+        Select: The paginated select
+
+    Raises:
+        ValueError: If limit is outside 1..MAX_PAGE_SIZE or the cursor is malformed
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    query = query.order_by(created_at_col.desc(), id_col.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(created_at_col, id_col) < tuple_(created_at, row_id))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def page_results(rows, limit: int, key):
+    """
+    Trim the extra row fetched by paginate and build the next cursor
+
+    Args:
+        rows: Rows returned by a paginated select
+        limit: Page size passed to paginate
+        key: Callable returning (created_at, id) for a row
+
+    Returns:
+        tuple: (rows, next_cursor), next_cursor is None on the last page
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,84 @@
+"""
+Post engagement counter helpers
+
+Posts carry denormalized upvote_count and comment_count columns so the
+feed does not have to run COUNT(*) per page. The adjust helpers are
+called inside the same transaction as the row they count, and
+reconcile_post_counters repairs any drift from the source tables.
+
+Run this module directly to reconcile all posts:
+
+    python post_counters.py
+"""
+
+from models import Comment, Post, Upvote
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+def _adjust(db: Session, post_id: int, column, delta: int):
+    """Atomically add delta to a counter column and return the new value"""
+    return db.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values({column: func.greatest(column + delta, 0)})
+        .returning(column)
+    ).scalar()
+
+def adjust_upvote_count(db: Session, post_id: int, delta: int):
+    """
+    Add delta to a post's upvote_count without committing
+
+    Returns:
+        int: The updated upvote count, or None if the post does not exist
+    """
+    return _adjust(db, post_id, Post.upvote_count, delta)
+
+def adjust_comment_count(db: Session, post_id: int, delta: int):
+    """
+    Add delta to a post's comment_count without committing
+
+    Returns:
+        int: The updated comment count, or None if the post does not exist
+    """
+    return _adjust(db, post_id, Post.comment_count, delta)
+
+def reconcile_post_counters(db: Session):
+    """
+    Recompute counters from the upvotes and comments tables
+
+    Only rows whose stored counters differ from the real counts are
+    rewritten.
+
+    Returns:
+        int: Number of posts that were repaired
+    """
+    upvotes = (
+        select(func.count()).select_from(Upvote)
+        .where(Upvote.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    comments = (
+        select(func.count()).select_from(Comment)
+        .where(Comment.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(Post)
+        .where((Post.upvote_count != upvotes) | (Post.comment_count != comments))
+        .values(upvote_count=upvotes, comment_count=comments)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        repaired = reconcile_post_counters(db)
+        print(f"[INFO] Reconciled counters for {repaired} posts")
+    finally:
+        db.close()
@@ -0,0 +1,162 @@
+"""
+User profile page helpers
+
+Each section of a profile page (profile, posts, portfolio, follow stats,
+reviews, review stats) has a builder here. The per-section endpoints and
+the composite /users/{id}/page endpoint share them, so both return the
+same shapes. The composite page loads the user once and runs one query
+per requested section on a single session.
+"""
+
+from image_derivatives import image_srcset
+from models import Follow, PortfolioItem, Post, Review, User, UserTag
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Session
+
+PROFILE_PAGE_SECTIONS = (
+    "profile", "posts", "portfolio_items", "follow_stats",
+    "is_following", "reviews", "review_stats"
+)
+
+def parse_fields(fields: str = None):
+    """
+    Turn a comma separated ?fields= value into a set of section names
+
+    Raises:
+        ValueError: If a requested section does not exist
+    """
+    if not fields:
+        return set(PROFILE_PAGE_SECTIONS)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(PROFILE_PAGE_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+def profile_section(db: Session, user: User):
+    skills = db.execute(select(UserTag.tag).where(UserTag.user_id == user.id)).scalars().all()
+    return {
+        "id": user.id,
+        "username": user.username,
+        "bio": user.bio,
+        "avatar_url": user.avatar_url,
+        "skills": skills,
+        "created_at": user.created_at
+    }
+
+def posts_section(db: Session, user_id: int):
+    posts = db.execute(
+        select(Post.id, Post.content, Post.image_url, Post.created_at, Post.author_id)
+        .where(Post.author_id == user_id)
+        .order_by(Post.created_at.desc())
+    ).all()
+    return [{
+        "id": post.id,
+        "content": post.content,
+        "image_url": post.image_url,
+        "image_srcset": image_srcset(post.image_url),
+        "created_at": post.created_at.isoformat(),
+        "author_id": post.author_id
+    } for post in posts]
+
+def portfolio_section(db: Session, user_id: int):
+    items = db.execute(
+        select(
+            PortfolioItem.id, PortfolioItem.title, PortfolioItem.description,
+            PortfolioItem.image_url, PortfolioItem.price, PortfolioItem.created_at
+        )
+        .where(PortfolioItem.artist_id == user_id)
+        .order_by(PortfolioItem.created_at.desc())
+    ).all()
+    return [{**item._asdict(), "image_srcset": image_srcset(item.image_url)} for item in items]
+
+def follow_section(db: Session, user_id: int, viewer_id: int = None):
+    """
+    Follower/following counts and whether the viewer follows user_id, in one query
+
+    Returns:
+        tuple: (follow_stats dict, is_following bool)
+    """
+    followers = select(func.count()).select_from(Follow).where(Follow.following_id == user_id).scalar_subquery()
+    following = select(func.count()).select_from(Follow).where(Follow.follower_id == user_id).scalar_subquery()
+    is_following = exists().where(Follow.follower_id == viewer_id, Follow.following_id == user_id)
+    row = db.execute(select(followers, following, is_following)).one()
+    return {
+        "followers_count": row[0] or 0,
+        "following_count": row[1] or 0
+    }, bool(viewer_id) and row[2]
+
+def reviews_section(db: Session, user_id: int):
+    reviews = db.execute(
+        select(Review, User)
+        .join(User, Review.reviewer_id == User.id)
+        .where(Review.artist_id == user_id)
+        .order_by(Review.created_at.desc())
+    ).all()
+    return [{
+        "id": review.id,
+        "rating": review.rating,
+        "comment": review.comment,
+        "created_at": review.created_at,
+        "reviewer": {
+            "id": reviewer.id,
+            "username": reviewer.username,
+            "avatar_url": reviewer.avatar_url
+        }
+    } for review, reviewer in reviews]
+
+def review_stats_section(db: Session, user_id: int):
+    """Review count, average and distribution from one grouped query"""
+    rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+    rating_distribution.update(db.execute(
+        select(Review.rating, func.count())
+        .where(Review.artist_id == user_id)
+        .group_by(Review.rating)
+    ).all())
+
+    total_reviews = sum(rating_distribution.values())
+    if not total_reviews:
+        return {"total_reviews": 0, "average_rating": 0, "rating_distribution": rating_distribution}
+
+    average_rating = sum(rating * count for rating, count in rating_distribution.items()) / total_reviews
+    return {
+        "total_reviews": total_reviews,
+        "average_rating": round(average_rating, 1),
+        "rating_distribution": rating_distribution
+    }
+
+def build_profile_page(db: Session, user_id: int, fields, viewer_id: int = None):
+    """
+    Assemble the requested sections of a user's profile page
+
+    Args:
+        db: Database session
+        user_id: Profile owner
+        fields: Set of section names from PROFILE_PAGE_SECTIONS
+        viewer_id: Signed-in viewer, used for is_following
+
+    Returns:
+        dict: One key per requested section, or None if the user does not exist
+    """
+    user = db.get(User, user_id)
+    if not user:
+        return None
+
+    page = {}
+    if "profile" in fields:
+        page["profile"] = profile_section(db, user)
+    if "posts" in fields:
+        page["posts"] = posts_section(db, user_id)
+    if "portfolio_items" in fields:
+        page["portfolio_items"] = portfolio_section(db, user_id)
+    if fields & {"follow_stats", "is_following"}:
+        follow_stats, is_following = follow_section(db, user_id, viewer_id)
+        if "follow_stats" in fields:
+            page["follow_stats"] = follow_stats
+        if "is_following" in fields:
+            page["is_following"] = is_following
+    if "reviews" in fields:
+        page["reviews"] = reviews_section(db, user_id)
+    if "review_stats" in fields:
+        page["review_stats"] = review_stats_section(db, user_id)
+    return page
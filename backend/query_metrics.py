@@ -0,0 +1,175 @@
+"""
+Per-request SQL statement counting and N+1 detection
+
+Engine event listeners count every statement run while a request is
+being handled, and how long the database took to answer them.
+QueryCounterMiddleware scopes the counting to one request through a
+context variable, so statements from background threads such as the
+notification outbox are not attributed to whichever request is running.
+
+After each request:
+    - per-route totals are added to query_stats (see /db/query-stats)
+    - with DEBUG=true, X-DB-Query-Count and X-DB-Time-Ms response
+      headers report the request's own numbers
+    - a statement shape repeated more than QUERY_REPEAT_THRESHOLD times
+      is logged as a likely N+1 query
+
+Statement shapes are the SQL text with expanded IN lists and multi-row
+VALUES collapsed, so one query per row of a page maps to a single shape.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+QUERY_DEBUG_HEADERS = os.getenv("DEBUG", "false").lower() == "true"
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "10"))
+
+# Bind parameter placeholders for psycopg2 (%(name)s) and asyncpg ($1)
+_PLACEHOLDER = r"(?:%\(\w+\)s|\$\d+|%s)"
+_PLACEHOLDER_LIST = re.compile(rf"\((?:{_PLACEHOLDER}, )+{_PLACEHOLDER}\)")
+_VALUES_ROWS = re.compile(r"\(\.\.\.\)(?:, \(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so queries differing only in list lengths compare equal"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PLACEHOLDER_LIST.sub("(...)", shape)
+    return _VALUES_ROWS.sub("(...)", shape)
+
+class RequestQueries:
+    """Statements executed while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        # Sync handlers and their dependencies may run on different threads
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int):
+        """Statement shapes executed more than threshold times"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+_current_request = ContextVar("current_request_queries", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        context._query_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    queries = _current_request.get()
+    started = getattr(context, "_query_started", None)
+    if queries is not None and started is not None:
+        queries.record(statement, time.perf_counter() - started)
+
+class QueryStats:
+    """Per-route totals across requests"""
+
+    def __init__(self):
+        self._routes = {}  # "METHOD /path" -> totals
+        self._lock = threading.Lock()
+
+    def record(self, route: str, queries: RequestQueries, repeated: bool):
+        with self._lock:
+            totals = self._routes.get(route)
+            if totals is None:
+                totals = self._routes[route] = {
+                    "requests": 0, "queries": 0, "db_seconds": 0.0, "max_queries": 0, "n_plus_one_warnings": 0
+                }
+            totals["requests"] += 1
+            totals["queries"] += queries.count
+            totals["db_seconds"] += queries.seconds
+            totals["max_queries"] = max(totals["max_queries"], queries.count)
+            if repeated:
+                totals["n_plus_one_warnings"] += 1
+
+    def routes(self):
+        """Copy of the raw per-route totals"""
+        with self._lock:
+            return {route: dict(totals) for route, totals in self._routes.items()}
+
+    def stats(self):
+        return {
+            route: {
+                "requests": totals["requests"],
+                "queries": totals["queries"],
+                "avg_queries": round(totals["queries"] / totals["requests"], 2),
+                "max_queries": totals["max_queries"],
+                "db_ms": round(totals["db_seconds"] * 1000, 2),
+                "avg_db_ms": round(totals["db_seconds"] / totals["requests"] * 1000, 2),
+                "n_plus_one_warnings": totals["n_plus_one_warnings"]
+            }
+            for route, totals in sorted(self.routes().items())
+        }
+
+query_stats = QueryStats()
+
+_route_paths = {}  # endpoint -> path template
+
+def route_name(scope) -> str:
+    """
+    "METHOD /path/{param}" for the route that handled the request
+
+    Uses the path template rather than the concrete path so every
+    /users/{user_id} request shares one entry. Requests that matched no
+    route are grouped under "unmatched".
+    """
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return f"{scope['method']} unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is not None:
+                _route_paths[route.endpoint] = route.path
+        path = _route_paths.get(endpoint, scope["path"])
+    return f"{scope['method']} {path}"
+
+class QueryCounterMiddleware:
+    """ASGI middleware counting the SQL statements each HTTP request runs"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = _current_request.set(queries)
+
+        async def send_with_headers(message):
+            # Statements run while streaming the body are counted in
+            # query_stats but happen too late for the headers
+            if message["type"] == "http.response.start" and QUERY_DEBUG_HEADERS:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(queries.count)
+                headers["X-DB-Time-Ms"] = f"{queries.seconds * 1000:.1f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_request.reset(token)
+            route = route_name(scope)
+            repeated = queries.repeated(QUERY_REPEAT_THRESHOLD)
+            for shape, count in repeated:
+                print(f"[QUERY] Possible N+1 in {route}: {count} executions of {shape[:200]}")
+            query_stats.record(route, queries, bool(repeated))
@@ -0,0 +1,211 @@
+"""
+Resumable chunked uploads
+
+A tus-like protocol for large files that may not survive one request:
+
+    POST   /uploads                  Start: filename, size, content_type
+    GET    /uploads/{id}             Current offset, to resume after a failure
+    PATCH  /uploads/{id}             Append the request body at Upload-Offset
+    POST   /uploads/{id}/complete    Hand the assembled file to storage
+    DELETE /uploads/{id}             Abort and discard the partial file
+
+Chunks are appended to a file under RESUMABLE_UPLOAD_DIR as the request
+body streams in, so memory per upload stays around one network read and
+a dropped connection keeps every byte written so far. The offset is the
+partial file's size, which makes it authoritative even after a crash.
+Session state lives on disk next to the data, so any worker on the same
+host can continue an upload. Sessions idle for longer than
+RESUMABLE_UPLOAD_TTL seconds are removed.
+
+Errors are raised as ValueError subclasses; the endpoints map them to
+HTTP status codes.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from uploads import MAX_UPLOAD_BYTES, UploadTooLargeError, store_image
+
+RESUMABLE_UPLOAD_DIR = os.getenv("RESUMABLE_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "artspire-uploads"))
+RESUMABLE_UPLOAD_TTL = int(os.getenv("RESUMABLE_UPLOAD_TTL", str(24 * 60 * 60)))
+# Largest body accepted by one PATCH; clients send chunks of at most this size
+RESUMABLE_MAX_CHUNK_BYTES = int(os.getenv("RESUMABLE_MAX_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+class UploadNotFoundError(ValueError):
+    pass
+
+class UploadConflictError(ValueError):
+    """The client's offset is stale or another request is writing to the upload"""
+
+os.makedirs(RESUMABLE_UPLOAD_DIR, exist_ok=True)
+
+def _paths(upload_id: str):
+    # Session ids are generated here; anything else cannot name a session file
+    try:
+        upload_id = uuid.UUID(upload_id).hex
+    except ValueError:
+        raise UploadNotFoundError("Upload not found")
+    base = os.path.join(RESUMABLE_UPLOAD_DIR, upload_id)
+    return f"{base}.json", f"{base}.part"
+
+def _load(upload_id: str, user_id: int):
+    meta_path, data_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            session = json.load(f)
+    except FileNotFoundError:
+        raise UploadNotFoundError("Upload not found")
+    # Other users' sessions are indistinguishable from missing ones
+    if session["user_id"] != user_id:
+        raise UploadNotFoundError("Upload not found")
+    session["offset"] = os.path.getsize(data_path)
+    return session
+
+def _describe(session):
+    return {
+        "upload_id": session["id"],
+        "offset": session["offset"],
+        "size": session["size"],
+        "max_chunk_size": RESUMABLE_MAX_CHUNK_BYTES
+    }
+
+def cleanup_expired_uploads():
+    """Delete sessions whose partial file has not been written to within the TTL"""
+    cutoff = time.time() - RESUMABLE_UPLOAD_TTL
+    removed = 0
+    for name in os.listdir(RESUMABLE_UPLOAD_DIR):
+        if not name.endswith(".part"):
+            continue
+        data_path = os.path.join(RESUMABLE_UPLOAD_DIR, name)
+        try:
+            if os.path.getmtime(data_path) < cutoff:
+                os.remove(data_path)
+                os.remove(data_path[:-len(".part")] + ".json")
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        print(f"[UPLOAD] Removed {removed} expired resumable uploads")
+    return removed
+
+def create_upload(user_id: int, filename: str, size: int, content_type: str = None):
+    """
+    Start a resumable upload of size bytes
+
+    Returns:
+        dict: upload_id, offset (0), size and max_chunk_size
+
+    Raises:
+        UploadTooLargeError: If size exceeds MAX_UPLOAD_BYTES
+        ValueError: If size is not positive
+    """
+    if size <= 0:
+        raise ValueError("Upload size must be positive")
+    if size > MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"File is larger than the upload limit of {MAX_UPLOAD_BYTES} bytes")
+    cleanup_expired_uploads()
+
+    session = {
+        "id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "filename": filename,
+        "content_type": content_type,
+        "size": size,
+        "created_at": time.time()
+    }
+    meta_path, data_path = _paths(session["id"])
+    open(data_path, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump(session, f)
+    session["offset"] = 0
+    return _describe(session)
+
+def get_upload(upload_id: str, user_id: int):
+    """Current state of an upload; offset is where the next chunk starts"""
+    return _describe(_load(upload_id, user_id))
+
+class ChunkWriter:
+    """
+    Appends one PATCH body to an upload's partial file
+
+    Holds an exclusive lock on the partial file from open() to close(),
+    so two requests can never interleave writes to the same upload.
+    """
+
+    def __init__(self, upload_id: str, user_id: int, offset: int):
+        self.session = _load(upload_id, user_id)
+        if offset != self.session["offset"]:
+            raise UploadConflictError(f"Upload is at offset {self.session['offset']}, not {offset}")
+        _, data_path = _paths(upload_id)
+        self._file = open(data_path, "ab")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._file.close()
+            raise UploadConflictError("Another request is writing to this upload")
+        # The offset may have moved while the lock was held elsewhere
+        if self._file.tell() != offset:
+            current = self._file.tell()
+            self._file.close()
+            raise UploadConflictError(f"Upload is at offset {current}, not {offset}")
+        self.written = 0
+
+    def write(self, data: bytes):
+        """
+        Raises:
+            UploadTooLargeError: If the chunk is too big or passes the declared size
+        """
+        if self.written + len(data) > RESUMABLE_MAX_CHUNK_BYTES:
+            raise UploadTooLargeError(f"Chunks are limited to {RESUMABLE_MAX_CHUNK_BYTES} bytes")
+        if self.session["offset"] + len(data) > self.session["size"]:
+            raise UploadTooLargeError(f"Upload is larger than the declared {self.session['size']} bytes")
+        self._file.write(data)
+        self.written += len(data)
+        self.session["offset"] += len(data)
+
+    def close(self):
+        """Flush what was received, even after an error, so the client can resume from it"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return _describe(self.session)
+
+def complete_upload(upload_id: str, user_id: int) -> str:
+    """
+    Store a fully received upload and discard the session
+
+    Blocks while the assembled file is hashed and handed to the storage
+    backend, so call it from a sync handler or through run_in_threadpool.
+
+    Returns:
+        str: Public URL of the stored image
+
+    Raises:
+        UploadConflictError: If bytes are still missing
+    """
+    session = _load(upload_id, user_id)
+    if session["offset"] != session["size"]:
+        raise UploadConflictError(f"Upload has {session['offset']} of {session['size']} bytes")
+
+    meta_path, data_path = _paths(upload_id)
+    with open(data_path, "rb") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflictError("Another request is writing to this upload")
+        url = store_image(f, session["filename"], session["content_type"])
+    delete_upload(upload_id, user_id)
+    return url
+
+def delete_upload(upload_id: str, user_id: int):
+    _load(upload_id, user_id)
+    meta_path, data_path = _paths(upload_id)
+    for path in (data_path, meta_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
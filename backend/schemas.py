@@ -172,6 +172,8 @@ class Notification(NotificationBase):
     created_at: datetime
     user_id: int
     actor_id: int
+    target_id: Optional[int] = None
+    actor_count: int = 1
     
     class Config:
         from_attributes = True
@@ -0,0 +1,223 @@
+"""
+Object storage for uploaded files
+
+Every backend offers the same methods:
+    put(key, stream, content_type)  Store a binary file-like object under key
+    get(key)                        The object's bytes
+    stream(key, chunk_size)         Iterate over the object in chunks
+    delete(key)                     Remove the object; missing keys are ignored
+    exists(key)                     Whether an object is stored under key
+    public_url(key)                 URL clients load the object from
+    key_for_url(url)                Key behind a public_url, None for other URLs
+    presign(key, expires_in)        Time-limited URL for the object
+    serve(key)                      Response for GET /media/{key}
+
+Backends:
+    supabase  Supabase Storage bucket. Default when SUPABASE_URL and
+              SUPABASE_KEY are set.
+    local     Directory on disk (STORAGE_LOCAL_ROOT) served by the API at
+              /media. Selected with STORAGE_BACKEND=local, or used when
+              Supabase is not configured, e.g. for offline development
+              and upload benchmarks.
+
+get/stream/serve raise FileNotFoundError for missing objects and
+ValueError for keys that are not valid object names.
+
+Objects under IMMUTABLE_PREFIXES (content-addressed uploads and their
+derivatives) never change once written, so they are served with a
+one-year immutable Cache-Control.
+"""
+
+import io
+import mimetypes
+import os
+import tempfile
+
+import httpx
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "artwork")
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase" if SUPABASE_URL and SUPABASE_KEY else "local")
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", os.path.join(os.path.dirname(__file__), "media"))
+STORAGE_PUBLIC_BASE_URL = os.getenv("STORAGE_PUBLIC_BASE_URL", "http://localhost:8000/media").rstrip("/")
+# When set (e.g. /protected-media/), local files are handed to nginx with
+# X-Accel-Redirect instead of being read by the API worker
+STORAGE_ACCEL_REDIRECT_PREFIX = os.getenv("STORAGE_ACCEL_REDIRECT_PREFIX")
+STORAGE_CHUNK_SIZE = 1024 * 1024
+
+IMMUTABLE_PREFIXES = ("objects/", "derived/")
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+def is_immutable(key: str) -> bool:
+    return key.startswith(IMMUTABLE_PREFIXES)
+
+def cache_headers(key: str) -> dict:
+    if is_immutable(key):
+        return {"Cache-Control": f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"}
+    return {}
+
+class SupabaseStorageBackend:
+    """Objects in a Supabase Storage bucket"""
+
+    def __init__(self, url: str, key: str, bucket: str):
+        from supabase import create_client
+
+        self.url = url
+        self.bucket_name = bucket
+        self.client = create_client(url, key)
+
+    def _bucket(self):
+        return self.client.storage.from_(self.bucket_name)
+
+    def put(self, key: str, stream, content_type: str):
+        # The storage client only streams buffered readers; anything else is read into memory
+        if not isinstance(stream, (io.BufferedReader, bytes)):
+            stream = stream.read()
+        options = {"content-type": content_type, "x-upsert": "true"}
+        if is_immutable(key):
+            options["cache-control"] = str(IMMUTABLE_MAX_AGE)
+        res = self._bucket().upload(key, stream, options)
+        if hasattr(res, "error") and res.error is not None:
+            raise RuntimeError(f"Upload failed: {res.error}")
+
+    def get(self, key: str) -> bytes:
+        return self._bucket().download(key)
+
+    def stream(self, key: str, chunk_size: int = STORAGE_CHUNK_SIZE):
+        with httpx.stream("GET", self.presign(key)) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(key)
+            response.raise_for_status()
+            yield from response.iter_bytes(chunk_size)
+
+    def delete(self, key: str):
+        self._bucket().remove([key])
+
+    def exists(self, key: str) -> bool:
+        try:
+            return self._bucket().exists(key)
+        except Exception:
+            return False
+
+    def public_url(self, key: str) -> str:
+        return f"{self.url}/storage/v1/object/public/{self.bucket_name}/{key}"
+
+    def key_for_url(self, url: str):
+        prefix = self.public_url("")
+        return url[len(prefix):] if url.startswith(prefix) else None
+
+    def presign(self, key: str, expires_in: int = 3600) -> str:
+        return self._bucket().create_signed_url(key, expires_in)["signedURL"]
+
+    def serve(self, key: str):
+        return RedirectResponse(self.public_url(key), headers=cache_headers(key))
+
+class SendfileResponse(FileResponse):
+    """
+    FileResponse that lets the server copy the file to the socket itself
+
+    Servers advertising the ASGI zero-copy send extension receive the
+    open file and send it with sendfile(2); others get the regular
+    chunked FileResponse.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if "http.response.zerocopysend" not in scope.get("extensions", {}):
+            await super().__call__(scope, receive, send)
+            return
+
+        size = os.stat(self.path).st_size
+        self.headers["content-length"] = str(size)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        with open(self.path, "rb") as file:
+            await send({"type": "http.response.zerocopysend", "file": file, "count": size, "more_body": False})
+
+class LocalStorageBackend:
+    """Objects as files under a directory, served at /media"""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError("Invalid storage key")
+        return path
+
+    def put(self, key: str, stream, content_type: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial object
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(STORAGE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as file:
+            return file.read()
+
+    def stream(self, key: str, chunk_size: int = STORAGE_CHUNK_SIZE):
+        with open(self._path(key), "rb") as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def key_for_url(self, url: str):
+        prefix = self.public_url("")
+        return url[len(prefix):] if url.startswith(prefix) else None
+
+    def presign(self, key: str, expires_in: int = 3600) -> str:
+        # Files under the local root are public, like the Supabase bucket
+        return self.public_url(key)
+
+    def serve(self, key: str):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(key)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if STORAGE_ACCEL_REDIRECT_PREFIX:
+            return Response(
+                media_type=media_type,
+                headers={"X-Accel-Redirect": f"{STORAGE_ACCEL_REDIRECT_PREFIX}{key}", **cache_headers(key)}
+            )
+        return SendfileResponse(path, media_type=media_type, headers=cache_headers(key))
+
+def _make_backend():
+    if STORAGE_BACKEND == "supabase":
+        if SUPABASE_URL and SUPABASE_KEY:
+            return SupabaseStorageBackend(SUPABASE_URL, SUPABASE_KEY, SUPABASE_BUCKET)
+        print("[STORAGE] SUPABASE_URL/SUPABASE_KEY not set, falling back to local storage")
+    return LocalStorageBackend(STORAGE_LOCAL_ROOT, STORAGE_PUBLIC_BASE_URL)
+
+storage = _make_backend()
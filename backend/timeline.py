@@ -0,0 +1,172 @@
+"""
+Home timeline (following feed) helpers
+
+Posts are fanned out on write: create_post copies a reference to the
+new post into timeline_entries for every follower, so reading the
+following feed is a single range scan over the reader's entries.
+
+Authors with more than TIMELINE_FANOUT_LIMIT followers are switched to
+fan-out on read. Their posts are not copied; instead they are merged
+into the reader's page when the timeline is read. They switch back only
+once they drop below TIMELINE_FANOUT_RESUME_LIMIT followers, so an
+author hovering around the limit does not flip mode on every post. On
+switching back, their recent posts are copied to every follower, since
+the ones written in pull mode never were.
+"""
+
+import os
+
+from models import Follow, Post, TimelineEntry, User
+from pagination import paginate, page_results
+from sqlalchemy import delete, func, insert, literal, select, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", "5000"))
+# Follower count below which a fan-out on read author goes back to fan-out on write
+TIMELINE_FANOUT_RESUME_LIMIT = int(os.getenv("TIMELINE_FANOUT_RESUME_LIMIT", str(TIMELINE_FANOUT_LIMIT * 4 // 5)))
+
+# Number of an author's recent posts copied into a new follower's timeline
+TIMELINE_BACKFILL_POSTS = 50
+
+def fan_out_post(db: Session, post: Post):
+    """
+    Copy a new post into its author's followers' timelines
+
+    Does not commit. Switches the author to fan-out on read when their
+    follower count exceeds TIMELINE_FANOUT_LIMIT, and back when it falls
+    below TIMELINE_FANOUT_RESUME_LIMIT. The author row is only written
+    when the mode changes.
+
+    Returns:
+        int: Number of timeline entries written
+    """
+    follower_count = db.execute(
+        select(func.count()).select_from(Follow).where(Follow.following_id == post.author_id)
+    ).scalar()
+
+    author = db.get(User, post.author_id)
+    if not author.fanout_on_read and follower_count > TIMELINE_FANOUT_LIMIT:
+        author.fanout_on_read = True
+    elif author.fanout_on_read and follower_count < TIMELINE_FANOUT_RESUME_LIMIT:
+        author.fanout_on_read = False
+        return _backfill_followers(db, post.author_id)
+    if author.fanout_on_read:
+        return 0
+
+    result = db.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id", "created_at"],
+            select(
+                Follow.follower_id,
+                literal(post.id),
+                literal(post.author_id),
+                literal(post.created_at)
+            ).where(Follow.following_id == post.author_id)
+        )
+    )
+    return result.rowcount
+
+def _backfill_followers(db: Session, author_id: int):
+    """Copy an author's recent posts, including ones made in pull mode, to every follower"""
+    recent_posts = (
+        select(Post.id, Post.created_at)
+        .where(Post.author_id == author_id)
+        .order_by(Post.created_at.desc())
+        .limit(TIMELINE_BACKFILL_POSTS)
+        .subquery()
+    )
+    result = db.execute(
+        pg_insert(TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id", "created_at"],
+            select(
+                Follow.follower_id,
+                recent_posts.c.id,
+                literal(author_id),
+                recent_posts.c.created_at
+            )
+            .select_from(Follow)
+            .join(recent_posts, true())
+            .where(Follow.following_id == author_id)
+        ).on_conflict_do_nothing(index_elements=[TimelineEntry.user_id, TimelineEntry.post_id])
+    )
+    return result.rowcount
+
+def add_author_to_timeline(db: Session, user_id: int, author_id: int):
+    """Backfill an author's recent posts after user_id follows them. Does not commit."""
+    author = db.get(User, author_id)
+    if author is None or author.fanout_on_read:
+        return
+
+    recent_posts = (
+        select(Post.id, Post.created_at)
+        .where(Post.author_id == author_id)
+        .order_by(Post.created_at.desc())
+        .limit(TIMELINE_BACKFILL_POSTS)
+        .subquery()
+    )
+    existing = select(TimelineEntry.post_id).where(TimelineEntry.user_id == user_id)
+    db.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id", "created_at"],
+            select(
+                literal(user_id),
+                recent_posts.c.id,
+                literal(author_id),
+                recent_posts.c.created_at
+            ).where(recent_posts.c.id.not_in(existing))
+        )
+    )
+
+def remove_author_from_timeline(db: Session, user_id: int, author_id: int):
+    """Drop an author's posts after user_id unfollows them. Does not commit."""
+    db.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.user_id == user_id,
+            TimelineEntry.author_id == author_id
+        )
+    )
+
+def get_timeline_page(db: Session, user_id: int, limit: int = 20, cursor: str = None):
+    """
+    Read one page of a user's following timeline
+
+    Args:
+        db: Database session
+        user_id: The reader
+        limit: Page size
+        cursor: Cursor returned with the previous page, if any
+
+    Returns:
+        tuple: ((Post, User) rows newest first, next_cursor)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    pushed = paginate(
+        select(Post, User)
+        .join(TimelineEntry, TimelineEntry.post_id == Post.id)
+        .join(User, Post.author_id == User.id)
+        .where(TimelineEntry.user_id == user_id),
+        TimelineEntry.created_at, TimelineEntry.post_id, limit, cursor=cursor
+    )
+    rows = db.execute(pushed).all()
+
+    pull_authors = (
+        select(Follow.following_id)
+        .join(User, Follow.following_id == User.id)
+        .where(Follow.follower_id == user_id, User.fanout_on_read.is_(True))
+        .correlate(None)
+    )
+    pulled = paginate(
+        select(Post, User)
+        .join(User, Post.author_id == User.id)
+        .where(Post.author_id.in_(pull_authors)),
+        Post.created_at, Post.id, limit, cursor=cursor
+    )
+    rows += db.execute(pulled).all()
+
+    # An author switched to fan-out on read may still have pushed entries
+    unique_rows = {row[0].id: row for row in rows}
+    rows = sorted(unique_rows.values(), key=lambda row: (row[0].created_at, row[0].id), reverse=True)
+    return page_results(rows, limit, lambda row: (row[0].created_at, row[0].id))
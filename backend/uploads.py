@@ -0,0 +1,186 @@
+"""
+Streaming image uploads
+
+Starlette spools multipart files to a temporary file while the request
+body arrives, so handlers never need a whole image in memory. The
+helpers here pass that spooled file to the storage backend as a stream:
+the backend reads it in UPLOAD_CHUNK_SIZE pieces while sending or
+writing, and MAX_UPLOAD_BYTES is enforced on those reads, so an
+oversized file is rejected without being loaded.
+
+The upload handlers are plain `def` endpoints, which FastAPI runs in its
+threadpool, so a slow upload ties up one worker thread rather than the
+event loop every other request is served from.
+
+Uploads are content-addressed: the object key is the SHA-256 of the
+bytes, so the same image uploaded twice is stored once, and a key never
+refers to different content. The stored_objects table indexes stored
+hashes, making a repeated upload a lookup instead of a transfer.
+"""
+
+import hashlib
+import io
+import mimetypes
+import os
+import re
+from datetime import datetime
+
+from fastapi import UploadFile
+from sqlalchemy.dialects.postgresql import insert
+
+from database import SessionLocal
+from image_derivatives import DERIVATIVES_ENABLED, is_resizable, schedule_derivatives
+from models import StoredObject
+from storage import storage
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+class UploadTooLargeError(ValueError):
+    pass
+
+class LimitedReader(io.RawIOBase):
+    """
+    Read-only view of a file that fails once more than limit bytes are read
+
+    Seeking is passed through so HTTP clients can measure the file and
+    send a Content-Length instead of a chunked body.
+    """
+
+    def __init__(self, source, limit: int):
+        self._source = source
+        self._limit = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._source.read(len(buffer))
+        if self._source.tell() > self._limit:
+            raise UploadTooLargeError(f"File is larger than the upload limit of {self._limit} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._source.seek(offset, whence)
+
+    def tell(self):
+        return self._source.tell()
+
+def content_key(sha256: str, filename: str = None, content_type: str = None) -> str:
+    """Storage key for a file with the given SHA-256, keeping its extension"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,8}", ext):
+        ext = mimetypes.guess_extension(content_type or "") or ""
+    return f"objects/{sha256[:2]}/{sha256}{ext}"
+
+def _hash_file(source):
+    """SHA-256 and size of a file, read in chunks under the upload limit"""
+    source.seek(0)
+    stream = io.BufferedReader(LimitedReader(source, MAX_UPLOAD_BYTES), buffer_size=UPLOAD_CHUNK_SIZE)
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+def store_file(source, filename: str = None, content_type: str = None):
+    """
+    Store a file under its content hash unless identical bytes are already stored
+
+    The file is hashed in one streaming pass, then looked up in the
+    stored_objects index. A hit costs no upload at all; a miss streams
+    the file to the storage backend and records it. Blocks until done,
+    so call it from a sync handler or through run_in_threadpool.
+
+    Args:
+        source: Seekable binary file, e.g. an UploadFile's spooled file
+        filename: Original name, used for the key's extension
+        content_type: MIME type stored with the object
+
+    Returns:
+        tuple: (key, created) where created is False for a duplicate
+
+    Raises:
+        UploadTooLargeError: If the file exceeds MAX_UPLOAD_BYTES
+    """
+    content_type = content_type or "application/octet-stream"
+    sha256, size = _hash_file(source)
+
+    with SessionLocal() as db:
+        existing = db.get(StoredObject, sha256)
+    if existing is not None:
+        print(f"[UPLOAD] {existing.key} already stored, skipping upload")
+        return existing.key, False
+
+    key = content_key(sha256, filename, content_type)
+    source.seek(0)
+    stream = io.BufferedReader(LimitedReader(source, MAX_UPLOAD_BYTES), buffer_size=UPLOAD_CHUNK_SIZE)
+    print(f"[UPLOAD] Storing {key} with {type(storage).__name__}")
+    storage.put(key, stream, content_type)
+
+    with SessionLocal() as db:
+        # A concurrent upload of the same bytes may have recorded it first
+        db.execute(
+            insert(StoredObject)
+            .values(sha256=sha256, key=key, size=size, content_type=content_type, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=[StoredObject.sha256])
+        )
+        db.commit()
+    return key, True
+
+def _check_declared_size(file: UploadFile):
+    # The multipart parser already knows the size; fail before reading anything
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"File is larger than the upload limit of {MAX_UPLOAD_BYTES} bytes")
+
+def store_upload(file: UploadFile) -> str:
+    """
+    Store an uploaded file content-addressed and return its public URL
+
+    Raises:
+        UploadTooLargeError: If the file exceeds MAX_UPLOAD_BYTES
+    """
+    _check_declared_size(file)
+    key, _ = store_file(file.file, file.filename, file.content_type)
+    return storage.public_url(key)
+
+def store_image(source, filename: str = None, content_type: str = None) -> str:
+    """
+    Store an image like store_file and render its resized derivatives
+
+    Derivatives are only scheduled for new content; a duplicate already
+    has them, or gets them on first request.
+
+    Returns:
+        str: Public URL of the stored image
+
+    Raises:
+        UploadTooLargeError: If the file exceeds MAX_UPLOAD_BYTES
+    """
+    key, created = store_file(source, filename, content_type)
+    if created and DERIVATIVES_ENABLED and is_resizable(key):
+        # The original is stored now, so the renderer reads it back from
+        # storage instead of holding the whole upload in memory meanwhile
+        schedule_derivatives(key)
+    return storage.public_url(key)
+
+def upload_image(file: UploadFile) -> str:
+    """
+    Store an uploaded image and render its resized derivatives
+
+    Returns:
+        str: Public URL of the stored image
+
+    Raises:
+        UploadTooLargeError: If the file exceeds MAX_UPLOAD_BYTES
+    """
+    _check_declared_size(file)
+    return store_image(file.file, file.filename, file.content_type)
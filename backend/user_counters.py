@@ -0,0 +1,125 @@
+"""
+Per-user unread counter helpers
+
+The user_counters table keeps each user's unread notification and
+message totals so unread-count endpoints are a primary key lookup
+instead of a COUNT(*) on every poll. The adjust helpers run inside the
+same transaction as the rows they count, and reconcile_user_counters
+repairs any drift from the source tables.
+
+Run this module directly (e.g. from cron) to reconcile all users:
+
+    python user_counters.py
+"""
+
+from models import Message, Notification, User, UserCounter
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+def _adjust(db: Session, user_id: int, column, delta: int):
+    """Atomically add delta to a counter, creating the row if needed, and return the new value"""
+    return db.execute(
+        insert(UserCounter)
+        .values({UserCounter.user_id: user_id, column: max(delta, 0)})
+        .on_conflict_do_update(
+            index_elements=[UserCounter.user_id],
+            set_={column.key: func.greatest(column + delta, 0)}
+        )
+        .returning(column)
+    ).scalar()
+
+def adjust_unread_notifications(db: Session, user_id: int, delta: int):
+    """
+    Add delta to a user's unread notification count without committing
+
+    Returns:
+        int: The updated count
+    """
+    return _adjust(db, user_id, UserCounter.unread_notifications, delta)
+
+def adjust_unread_messages(db: Session, user_id: int, delta: int):
+    """
+    Add delta to a user's unread message count without committing
+
+    Returns:
+        int: The updated count
+    """
+    return _adjust(db, user_id, UserCounter.unread_messages, delta)
+
+def reset_unread_notifications(db: Session, user_id: int):
+    """Set a user's unread notification count to zero without committing"""
+    db.execute(
+        update(UserCounter)
+        .where(UserCounter.user_id == user_id)
+        .values(unread_notifications=0)
+    )
+
+def get_unread_notifications(db: Session, user_id: int):
+    return db.execute(
+        select(UserCounter.unread_notifications).where(UserCounter.user_id == user_id)
+    ).scalar() or 0
+
+def get_unread_messages(db: Session, user_id: int):
+    return db.execute(
+        select(UserCounter.unread_messages).where(UserCounter.user_id == user_id)
+    ).scalar() or 0
+
+def get_unread_notifications_for(db: Session, user_ids):
+    """Look up several users' unread notification counts at once"""
+    return dict(db.execute(
+        select(UserCounter.user_id, UserCounter.unread_notifications)
+        .where(UserCounter.user_id.in_(user_ids))
+    ).all())
+
+def reconcile_user_counters(db: Session):
+    """
+    Recompute counters from the notifications and messages tables
+
+    Creates missing rows and rewrites only those whose stored counters
+    differ from the real counts.
+
+    Returns:
+        int: Number of users that were repaired
+    """
+    notifications = (
+        select(func.count()).select_from(Notification)
+        .where(Notification.user_id == User.id, Notification.is_read.is_not(True))
+        .correlate(User)
+        .scalar_subquery()
+    )
+    messages = (
+        select(func.count()).select_from(Message)
+        .where(Message.receiver_id == User.id, Message.is_read.is_not(True))
+        .correlate(User)
+        .scalar_subquery()
+    )
+    actual = select(
+        User.id.label("user_id"),
+        notifications.label("unread_notifications"),
+        messages.label("unread_messages")
+    )
+    stmt = insert(UserCounter).from_select(["user_id", "unread_notifications", "unread_messages"], actual)
+    result = db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserCounter.user_id],
+            set_={
+                "unread_notifications": stmt.excluded.unread_notifications,
+                "unread_messages": stmt.excluded.unread_messages
+            },
+            where=(UserCounter.unread_notifications != stmt.excluded.unread_notifications)
+            | (UserCounter.unread_messages != stmt.excluded.unread_messages)
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        repaired = reconcile_user_counters(db)
+        print(f"[INFO] Reconciled unread counters for {repaired} users")
+    finally:
+        db.close()
@@ -7,6 +7,7 @@ const NotificationBell = () => {
   const [unreadCount, setUnreadCount] = useState(0);
   const [showList, setShowList] = useState(false);
   const [isAnimating, setIsAnimating] = useState(false);
+  const [refreshKey, setRefreshKey] = useState(0);
   const bellRef = useRef(null);
   const notificationService = new NotificationService();
 
@@ -55,6 +56,20 @@ const NotificationBell = () => {
   }, []);
 
   useEffect(() => {
+    const close = notificationService.subscribe((event) => {
+      setUnreadCount(event.unread_count || 0);
+      if (event.type === 'notification') {
+        // Animate bell and reload the list when a new notification arrives
+        setIsAnimating(true);
+        setTimeout(() => setIsAnimating(false), 600);
+        setRefreshKey((key) => key + 1);
+      }
+    });
+    if (close) {
+      return close;
+    }
+
+    // Streaming unavailable, fall back to polling
     fetchUnread();
     const interval = setInterval(fetchUnread, 10000);
     return () => clearInterval(interval);
@@ -104,7 +119,7 @@ const NotificationBell = () => {
             </button>
           )}
         </div>
-        <NotificationList />
+        <NotificationList refreshKey={refreshKey} />
       </div>
     </div>
   );
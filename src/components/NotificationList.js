@@ -40,7 +40,7 @@ function formatTime(isoString) {
   return date.toLocaleDateString();
 }
 
-const NotificationList = () => {
+const NotificationList = ({ refreshKey = 0 }) => {
   const [notifications, setNotifications] = useState([]);
   const [loading, setLoading] = useState(true);
 
@@ -58,11 +58,10 @@ const NotificationList = () => {
     }
   }, []);
 
+  // New notifications are pushed to NotificationBell, which bumps refreshKey
   useEffect(() => {
     fetchNotifications();
-    const interval = setInterval(fetchNotifications, 10000); // auto-update every 10s
-    return () => clearInterval(interval);
-  }, [fetchNotifications]);
+  }, [fetchNotifications, refreshKey]);
 
   if (loading) {
     return (
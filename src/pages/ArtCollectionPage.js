@@ -41,6 +41,12 @@ const ArtCollectionPage = ({ user }) => {
     return `http://localhost:8000/${imageUrl}`;
   };
 
+  // Resized WebP copies from the backend, as an <img srcSet> value
+  const toSrcSet = (srcset) => {
+    if (!srcset) return undefined;
+    return Object.entries(srcset).map(([width, url]) => `${url} ${width}w`).join(', ');
+  };
+
   const getAvatarUrl = (avatar_url) => {
     if (!avatar_url) return '/default-avatar.svg';
     if (avatar_url.startsWith('/')) {
@@ -120,6 +126,8 @@ const ArtCollectionPage = ({ user }) => {
               <div className="artwork-image-container">
                 <img
                   src={getImageUrl(artwork.image_url)}
+                  srcSet={toSrcSet(artwork.image_srcset)}
+                  sizes="(max-width: 499px) 100vw, (max-width: 767px) 50vw, (max-width: 1023px) 33vw, 25vw"
                   alt={artwork.title}
                   className="artwork-image"
                   onError={(e) => {
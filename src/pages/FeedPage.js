@@ -479,6 +479,12 @@ const FeedPage = ({ currentUser }) => {
     return `http://localhost:8000${avatarUrl}`;
   };
 
+  // Resized WebP copies from the backend, as an <img srcSet> value
+  const toSrcSet = (srcset) => {
+    if (!srcset) return undefined;
+    return Object.entries(srcset).map(([width, url]) => `${url} ${width}w`).join(', ');
+  };
+
   const navigateToUserProfile = (userId) => {
     navigate(`/user/${userId}`);
   };
@@ -781,6 +787,8 @@ const FeedPage = ({ currentUser }) => {
                   <div className="post-image-container">
                     <img 
                       src={post.image_url} 
+                      srcSet={toSrcSet(post.image_srcset)}
+                      sizes="(max-width: 700px) 100vw, 640px"
                       alt="Post content" 
                       className="post-image"
                       onClick={() => openImagePreview(post.image_url, 'Post content')}
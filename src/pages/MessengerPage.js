@@ -12,6 +12,20 @@ const MessengerPage = () => {
   const [sendingMessage, setSendingMessage] = useState(false);
   const messagesEndRef = useRef(null);
   const [currentUser, setCurrentUser] = useState(null);
+  // Real-time channel; polling only runs while it is disconnected
+  const [socketOpen, setSocketOpen] = useState(false);
+  const [deliveredIds, setDeliveredIds] = useState(() => new Set());
+  const socketRef = useRef(null);
+  const selectedConversationRef = useRef(null);
+  const currentUserRef = useRef(null);
+
+  useEffect(() => {
+    selectedConversationRef.current = selectedConversation;
+  }, [selectedConversation]);
+
+  useEffect(() => {
+    currentUserRef.current = currentUser;
+  }, [currentUser]);
 
   // Scroll to bottom of messages
   const scrollToBottom = () => {
@@ -82,10 +96,99 @@ const MessengerPage = () => {
 
     fetchConversations();
     
-    // Refresh conversations every 10 seconds
+    // Fall back to refreshing conversations every 10 seconds without a socket
+    if (socketOpen) return;
     const interval = setInterval(fetchConversations, 10000);
     return () => clearInterval(interval);
-  }, [userId]);
+  }, [userId, socketOpen]);
+
+  // Add a message to the open conversation, ignoring duplicates
+  const appendMessage = (message) => {
+    setMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, message]);
+  };
+
+  // Move a conversation to the top with its latest message
+  const updateConversation = (otherUser, message, unreadIncrement = 0) => {
+    setConversations(prev => {
+      const existing = prev.find(conv => conv.user.id === otherUser.id);
+      const updated = {
+        user: existing ? existing.user : otherUser,
+        last_message: message.content,
+        last_message_time: message.created_at,
+        last_sender_id: message.sender_id,
+        unread_count: (existing ? existing.unread_count : 0) + unreadIncrement
+      };
+      return [updated, ...prev.filter(conv => conv.user.id !== otherUser.id)];
+    });
+  };
+
+  // Open the real-time messaging socket, reconnecting if it drops
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token || typeof WebSocket === 'undefined') return;
+
+    let closed = false;
+    let reconnectTimer = null;
+
+    const handleEvent = (event) => {
+      const me = currentUserRef.current;
+      const open = selectedConversationRef.current;
+
+      if (event.type === 'message') {
+        const message = event.message;
+        const isOwn = me && message.sender_id === me.id;
+        const otherUser = isOwn ? message.receiver : message.sender;
+        const isOpen = open && open.id === otherUser.id;
+
+        if (isOpen) {
+          appendMessage(message);
+          if (!isOwn) {
+            socketRef.current?.send(JSON.stringify({ type: 'read', user_id: otherUser.id }));
+          }
+        }
+        updateConversation(otherUser, message, !isOwn && !isOpen ? 1 : 0);
+      } else if (event.type === 'delivered') {
+        setDeliveredIds(prev => new Set(prev).add(event.message_id));
+      } else if (event.type === 'read') {
+        const readIds = new Set(event.message_ids);
+        setMessages(prev => prev.map(m => readIds.has(m.id) ? { ...m, is_read: true } : m));
+        if (me && event.reader_id === me.id) {
+          setConversations(prev => prev.map(conv =>
+            conv.user.id === event.sender_id ? { ...conv, unread_count: 0 } : conv
+          ));
+        }
+      }
+    };
+
+    const connect = () => {
+      const socket = new WebSocket(`ws://localhost:8000/ws/messages?token=${encodeURIComponent(token)}`);
+      socketRef.current = socket;
+
+      socket.onopen = () => setSocketOpen(true);
+      socket.onmessage = (e) => {
+        try {
+          handleEvent(JSON.parse(e.data));
+        } catch (error) {
+          console.error('Error handling message event:', error);
+        }
+      };
+      socket.onclose = () => {
+        setSocketOpen(false);
+        if (!closed) {
+          reconnectTimer = setTimeout(connect, 5000);
+        }
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      socketRef.current?.close();
+      socketRef.current = null;
+    };
+  }, []);
 
   // Fetch user details for starting a new conversation
   const fetchUserForNewConversation = async (targetUserId) => {
@@ -112,12 +215,16 @@ const MessengerPage = () => {
   useEffect(() => {
     if (selectedConversation) {
       fetchMessages(selectedConversation.id);
-      
-      // Refresh messages every 5 seconds when a conversation is selected
+    }
+  }, [selectedConversation]);
+
+  // Without a socket, refresh messages every 5 seconds when a conversation is selected
+  useEffect(() => {
+    if (selectedConversation && !socketOpen) {
       const interval = setInterval(() => fetchMessages(selectedConversation.id), 5000);
       return () => clearInterval(interval);
     }
-  }, [selectedConversation]);
+  }, [selectedConversation, socketOpen]);
 
   const fetchMessages = async (otherUserId) => {
     const token = localStorage.getItem('token');
@@ -159,37 +266,10 @@ const MessengerPage = () => {
 
       if (response.ok) {
         const sentMessage = await response.json();
-        setMessages(prev => [...prev, sentMessage]);
+        // The socket may already have delivered the echo of this message
+        appendMessage(sentMessage);
         setNewMessage('');
-        
-        // Update conversations list - check if this conversation already exists
-        const existingConvIndex = conversations.findIndex(conv => conv.user.id === selectedConversation.id);
-        
-        if (existingConvIndex !== -1) {
-          // Update existing conversation
-          setConversations(prev => 
-            prev.map((conv, index) => 
-              index === existingConvIndex 
-                ? {
-                    ...conv,
-                    last_message: newMessage,
-                    last_message_time: new Date().toISOString(),
-                    last_sender_id: currentUser?.id
-                  }
-                : conv
-            )
-          );
-        } else {
-          // Add new conversation to the list
-          const newConversation = {
-            user: selectedConversation,
-            last_message: newMessage,
-            last_message_time: new Date().toISOString(),
-            last_sender_id: currentUser?.id,
-            unread_count: 0
-          };
-          setConversations(prev => [newConversation, ...prev]);
-        }
+        updateConversation(selectedConversation, sentMessage);
       }
     } catch (error) {
       console.error('Error sending message:', error);
@@ -398,6 +478,7 @@ const MessengerPage = () => {
                           </div>
                           <div className="message-time">
                             {formatTime(message.created_at)}
+                            {isOwn && (message.is_read ? ' · Read' : deliveredIds.has(message.id) ? ' · Delivered' : '')}
                           </div>
                         </div>
                       </div>
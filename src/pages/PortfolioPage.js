@@ -16,6 +16,66 @@ function parseSkills(skills) {
   return [];
 }
 
+// Files above this size use the resumable /uploads protocol, so a dropped
+// connection only costs the chunk in flight instead of the whole file
+const RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 5;
+
+// Upload a file in chunks, resuming from the server's offset after a failure.
+// The upload id is remembered per file, so retrying after a reload continues too.
+async function uploadArtworkResumable(file, token) {
+  const auth = { Authorization: `Bearer ${token}` };
+  const storageKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+  let upload = null;
+
+  const savedId = localStorage.getItem(storageKey);
+  if (savedId) {
+    const res = await fetch(`http://localhost:8000/uploads/${savedId}`, { headers: auth });
+    if (res.ok) upload = await res.json();
+  }
+  if (!upload) {
+    const form = new FormData();
+    form.append('filename', file.name);
+    form.append('size', file.size);
+    if (file.type) form.append('content_type', file.type);
+    const res = await fetch('http://localhost:8000/uploads', { method: 'POST', headers: auth, body: form });
+    if (!res.ok) throw new Error(await res.text());
+    upload = await res.json();
+    localStorage.setItem(storageKey, upload.upload_id);
+  }
+
+  let offset = upload.offset;
+  let failures = 0;
+  while (offset < file.size) {
+    const chunk = file.slice(offset, offset + upload.max_chunk_size);
+    try {
+      const res = await fetch(`http://localhost:8000/uploads/${upload.upload_id}`, {
+        method: 'PATCH',
+        headers: { ...auth, 'Upload-Offset': String(offset), 'Content-Type': 'application/offset+octet-stream' },
+        body: chunk,
+      });
+      if (res.status === 404 || res.status === 413) throw Object.assign(new Error(await res.text()), { fatal: true });
+      if (!res.ok) throw new Error(await res.text());
+      offset = (await res.json()).offset;
+      failures = 0;
+    } catch (err) {
+      if (err.fatal || ++failures > UPLOAD_CHUNK_RETRIES) {
+        localStorage.removeItem(storageKey);
+        throw err;
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+      // Part of the chunk may have been stored; continue from wherever the server got to
+      const res = await fetch(`http://localhost:8000/uploads/${upload.upload_id}`, { headers: auth }).catch(() => null);
+      if (res && res.ok) offset = (await res.json()).offset;
+    }
+  }
+
+  const res = await fetch(`http://localhost:8000/uploads/${upload.upload_id}/complete`, { method: 'POST', headers: auth });
+  if (!res.ok) throw new Error(await res.text());
+  localStorage.removeItem(storageKey);
+  return (await res.json()).url;
+}
+
 const PortfolioPage = ({ user }) => {
   const [portfolioItems, setPortfolioItems] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -75,7 +135,15 @@ const PortfolioPage = ({ user }) => {
     try {
       const token = localStorage.getItem('token');
       // If a file is selected, upload it to backend/Supabase
-      if (artworkImageFile) {
+      if (artworkImageFile && artworkImageFile.size > RESUMABLE_UPLOAD_THRESHOLD) {
+        try {
+          imageUrl = await uploadArtworkResumable(artworkImageFile, token);
+        } catch (err) {
+          alert('Image upload failed: ' + err.message);
+          setCreating(false);
+          return;
+        }
+      } else if (artworkImageFile) {
         const imgForm = new FormData();
         imgForm.append('file', artworkImageFile);
         const imgRes = await fetch('http://localhost:8000/upload-artwork-image', {
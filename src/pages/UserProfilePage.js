@@ -26,16 +26,8 @@ const UserProfilePage = ({ currentUser }) => {
   });
 
   useEffect(() => {
-    fetchUserProfile();
-    fetchUserPortfolio();
-    fetchFollowStats();
+    fetchProfilePage();
     fetchNotifications();
-    fetchReviews();
-    fetchReviewStats();
-    // Check if current user is following this user
-    if (currentUser && currentUser.id !== parseInt(userId)) {
-      checkIsFollowing();
-    }
     // Hide notifications dropdown on outside click
     function handleClickOutside(event) {
       if (notificationRef.current && !notificationRef.current.contains(event.target)) {
@@ -49,61 +41,33 @@ const UserProfilePage = ({ currentUser }) => {
     // eslint-disable-next-line
   }, [userId, currentUser]);
 
-  const fetchUserProfile = async () => {
-    try {
-      const response = await fetch(`http://localhost:8000/users/${userId}`);
-      if (response.ok) {
-        const userData = await response.json();
-        setUser(userData);
-      }
-    } catch (error) {
-      console.error('Error fetching user profile:', error);
-    }
-  };
-
-  const fetchUserPortfolio = async () => {
+  // Load every section the page renders in one request; pass a comma
+  // separated list of sections to refresh only those
+  const fetchProfilePage = async (fields = 'profile,portfolio_items,follow_stats,is_following,reviews,review_stats') => {
     try {
-      const response = await fetch(`http://localhost:8000/users/${userId}/portfolio`);
+      const token = localStorage.getItem('token');
+      const response = await fetch(`http://localhost:8000/users/${userId}/page?fields=${fields}`, {
+        headers: token ? { 'Authorization': `Bearer ${token}` } : {}
+      });
       if (response.ok) {
         const data = await response.json();
-        setPortfolioItems(data.portfolio_items || []);
+        if (data.profile) setUser(data.profile);
+        if (data.portfolio_items) setPortfolioItems(data.portfolio_items);
+        if (data.follow_stats) {
+          setFollowersCount(data.follow_stats.followers_count || 0);
+          setFollowingCount(data.follow_stats.following_count || 0);
+        }
+        if (data.is_following !== undefined) setIsFollowing(data.is_following);
+        if (data.reviews) setReviews(data.reviews);
+        if (data.review_stats) setReviewStats(data.review_stats);
       }
     } catch (error) {
-      console.error('Error fetching portfolio:', error);
+      console.error('Error fetching profile page:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  // Fetch follower/following counts
-  const fetchFollowStats = async () => {
-    try {
-      const response = await fetch(`http://localhost:8000/users/${userId}/follow_stats`);
-      if (response.ok) {
-        const data = await response.json();
-        setFollowersCount(data.followers_count || 0);
-        setFollowingCount(data.following_count || 0);
-      }
-    } catch (error) {
-      // ignore
-    }
-  };
-
-  // Check if current user is following this user
-  const checkIsFollowing = async () => {
-    try {
-      const response = await fetch(`http://localhost:8000/users/${userId}/is_following`, {
-        headers: { 'Authorization': `Bearer ${localStorage.getItem('token')}` }
-      });
-      if (response.ok) {
-        const data = await response.json();
-        setIsFollowing(data.is_following);
-      }
-    } catch (error) {
-      // ignore
-    }
-  };
-
   // Follow/unfollow user
   const handleFollow = async () => {
     console.log(`[FRONTEND DEBUG] Attempting to ${isFollowing ? 'unfollow' : 'follow'} user: ${userId}`);
@@ -123,7 +87,7 @@ const UserProfilePage = ({ currentUser }) => {
         console.log(`[FRONTEND DEBUG] ${isFollowing ? 'Unfollow' : 'Follow'} successful`);
         setIsFollowing(!isFollowing);
         // Fetch updated stats from server to ensure accuracy
-        fetchFollowStats();
+        fetchProfilePage('follow_stats');
       } else {
         const errorData = await response.json();
         console.log(`[FRONTEND DEBUG] ${isFollowing ? 'Unfollow' : 'Follow'} error: ${JSON.stringify(errorData)}`);
@@ -149,32 +113,6 @@ const UserProfilePage = ({ currentUser }) => {
     }
   };
 
-  // Fetch reviews
-  const fetchReviews = async () => {
-    try {
-      const response = await fetch(`http://localhost:8000/users/${userId}/reviews`);
-      if (response.ok) {
-        const data = await response.json();
-        setReviews(data.reviews || []);
-      }
-    } catch (error) {
-      // ignore
-    }
-  };
-
-  // Fetch review stats
-  const fetchReviewStats = async () => {
-    try {
-      const response = await fetch(`http://localhost:8000/users/${userId}/reviews/stats`);
-      if (response.ok) {
-        const data = await response.json();
-        setReviewStats(data);
-      }
-    } catch (error) {
-      // ignore
-    }
-  };
-
   // Submit review
   const submitReview = async (e) => {
     e.preventDefault();
@@ -198,8 +136,7 @@ const UserProfilePage = ({ currentUser }) => {
       if (response.ok) {
         setShowReviewForm(false);
         setReviewFormData({ rating: 5, comment: '' });
-        fetchReviews();
-        fetchReviewStats();
+        fetchProfilePage('reviews,review_stats');
       } else {
         const errorData = await response.json();
         alert(errorData.detail || 'Failed to submit review');
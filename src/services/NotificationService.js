@@ -152,6 +152,32 @@ class NotificationService {
         }
     }
 
+    // Subscribe to pushed notification events (server-sent events).
+    // Calls onEvent with {type: 'notification' | 'unread_count', ...}.
+    // Returns a function that closes the stream, or null if streaming
+    // is unavailable and the caller should fall back to polling.
+    subscribe(onEvent) {
+        const token = this.getAuthToken();
+        if (!token || typeof EventSource === 'undefined') {
+            return null;
+        }
+
+        const source = new EventSource(
+            `${this.apiUrl}/notifications/stream?token=${encodeURIComponent(token)}`
+        );
+        const handle = (event) => {
+            try {
+                onEvent(JSON.parse(event.data));
+            } catch (error) {
+                console.error('Error handling notification event:', error);
+            }
+        };
+        source.addEventListener('notification', handle);
+        source.addEventListener('unread_count', handle);
+        // EventSource reconnects on its own after network errors
+        return () => source.close();
+    }
+
     // Process notification event (for testing)
     async processEvent(eventData) {
         try {